@@ -1,57 +1,87 @@
-import re
+import sys
 import argparse
 
 
-def process_matched_strings(_list):
-    """Post-processing the sub-groups returned by re.findall()
-    for the matched pattern elements.
+from scanner import SSN, TELEPHONE, register_detector, compile_delimited, scan_file, scan_paths
+
+
+def print_matches(input_path, regex, offsets):
+    """Prints the matches of a pattern in a file, as they are found,
+    without the line breaks matched around them.
+
+    Arguments:
+        input_path (str):
+            Path to input file.
+        regex (re.Pattern):
+            Pattern returned by :func: ``scanner.compile_delimited``.
+        offsets (bool):
+            If True, the byte offset of each match is printed before it.
     """
-    matched_strings = []
-    for _tuple in _list:
-        filtered_tuple = [x for x in _tuple if x != '']
-        matched_strings.append(filtered_tuple[0].strip('\n'))
-    return matched_strings
+    for offset, _, value in scan_file(input_path, regex):
+        value = value.rstrip('\r\n')
+        matched_string = value.lstrip('\r\n')
+        if offsets:
+            print(f'{offset + len(value) - len(matched_string)}\t{matched_string}')
+        else:
+            print(matched_string)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='CS6320: Homework 1')
     parser.add_argument('--run', dest='run', type=str,
-                        choices=['ssn', 'tno'],
+                        choices=['ssn', 'tno', 'scan'],
                         required=True, help='Identifier program to run, choices are:\
                         (a) ssn: Social Security Numbers\
-                        (b) tno: Telephone Numbers')
-    parser.add_argument('--input-path', dest='input_path', type=str,
-                        required=True, help='Path to input .txt file.')
+                        (b) tno: Telephone Numbers\
+                        (c) scan: All enabled detectors, in a single pass')
+    parser.add_argument('--input-path', dest='input_paths', type=str, nargs='+',
+                        required=True, help='Path to input .txt file. With \'scan\', \
+                        paths, directories or glob patterns of input files.')
+    parser.add_argument('--offsets', dest='offsets', action='store_true',
+                        help='Print byte offset of each match in input file.')
+    parser.add_argument('--detectors', dest='detectors', type=str, nargs='+',
+                        help='Names of detectors enabled by \'scan\'. If argument is \
+                        not passed, all detectors are enabled.')
+    parser.add_argument('--detector', dest='custom_detectors', type=str, action='append',
+                        default=[], help='Additional detector for \'scan\', as \
+                        NAME=PATTERN. May be passed several times.')
+    parser.add_argument('--workers', dest='workers', type=int, default=1,
+                        help='Number of worker processes for \'scan\'. If greater than \
+                        1, input files are scanned in parallel.')
+    parser.add_argument('--output-file', dest='output_file', type=str, default='-',
+                        help='Path to which \'scan\' writes matches as JSON lines, or \
+                        \'-\' for standard output.')
 
     args = parser.parse_args()
 
-    with open(args.input_path, 'r') as text_file:
-        text = text_file.read()
+    if args.run == 'scan':
+        for detector in args.custom_detectors:
+            name, _, pattern = detector.partition('=')
+            try:
+                register_detector(name, pattern)
+            except ValueError as error:
+                parser.error(str(error))
+        detectors = args.detectors
+        if detectors is not None:
+            detectors += [detector.partition('=')[0] for detector in args.custom_detectors]
+
+        try:
+            summary = scan_paths(args.input_paths, args.output_file, detectors, args.workers)
+        except ValueError as error:
+            parser.error(str(error))
+        counts = ', '.join(f'{name}: {count}' for name, count in summary['matches'].items())
+        print(f"Scanned {summary['files']} files, matches by detector: {counts}", file=sys.stderr)
+        sys.exit()
+
+    if len(args.input_paths) > 1:
+        parser.error(f'--run {args.run} takes a single input path.')
+    input_path = args.input_paths[0]
 
     if args.run == 'ssn':
-        pattern = (r"((\s|^)(00[1-9]|0[1-9]\d|[1-9]\d\d)\d{2}"
-                   r"(000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d)(\s|$))"
-                   r"|"
-                   r"((\s|^)(00[1-9]|0[1-9]\d|[1-9]\d\d)-\d{2}-"
-                   r"(000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d)(\s|$))")
+        regex = compile_delimited(SSN)
         print("Printing matching Social Security Numbers: ")
     elif args.run == "tno":
-        pattern = (r"((\s|^)(\+\((0[1-9]|[1-9]\d)\)-\((00[1-9]|0[1-9]\d|[1-9]\d\d)\)-"
-                   r"\((00[1-9]|0[1-9]\d|[1-9]\d\d)\)-"
-                   r"\((000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d)\))(\s|$))"
-                   r"|"
-                   r"((\s|^)(\+\((0[1-9]|[1-9]\d)\)-(00[1-9]|0[1-9]\d|[1-9]\d\d)-"
-                   r"(00[1-9]|0[1-9]\d|[1-9]\d\d)-"
-                   r"(000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d))(\s|$))"
-                   r"|"
-                   r"((\s|^)(\+(0[1-9]|[1-9]\d)-(00[1-9]|0[1-9]\d|[1-9]\d\d)-"
-                   r"(00[1-9]|0[1-9]\d|[1-9]\d\d)-"
-                   r"(000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d))(\s|$))")
+        regex = compile_delimited(TELEPHONE)
         print("Printing matching Telephone Numbers:")
 
-    matches = re.findall(pattern, text, re.M)
-
-    matches = [match for match in process_matched_strings(matches)]
-
-    for match in matches:
-        print(match)
+    print_matches(input_path, regex, args.offsets)
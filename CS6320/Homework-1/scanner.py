@@ -0,0 +1,276 @@
+"""
+Single-pass scanning of files for several kinds of identifiers.
+
+Each kind of identifier is found by a detector, i.e. a regular
+expression registered under a name with :func: ``register_detector``.
+All enabled detectors are compiled into one pattern, with one named
+group per detector, so each file is read once, however many detectors
+are enabled, and each match is labelled by the name of the group that
+matched it.
+
+Detectors only match identifiers which are preceded and followed by
+whitespace, or by the start or end of the file. These boundaries are
+checked by lookarounds, rather than matched, so identifiers separated
+by a single space, or found by different detectors, do not compete for
+the whitespace between them.
+
+Files are memory-mapped and scanned lazily, and, with several workers,
+are spread across a pool of processes. Results are written in file
+order, as JSON lines of file, byte offset, detector and matched string.
+
+The single-identifier programs of ``main`` ('--run ssn' and 'tno')
+scan files with the same function, :func: ``scan_file``, using a
+pattern from :func: ``compile_delimited``, which keeps their original
+matching of the surrounding whitespace.
+"""
+
+
+import os
+import re
+import sys
+import glob
+import json
+import mmap
+from multiprocessing import Pool
+
+
+SSN = (r"(00[1-9]|0[1-9]\d|[1-9]\d\d)\d{2}(000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d)"
+       r"|"
+       r"(00[1-9]|0[1-9]\d|[1-9]\d\d)-\d{2}-(000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d)")
+
+TELEPHONE = (r"\+\((0[1-9]|[1-9]\d)\)-\((00[1-9]|0[1-9]\d|[1-9]\d\d)\)-"
+             r"\((00[1-9]|0[1-9]\d|[1-9]\d\d)\)-"
+             r"\((000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d)\)"
+             r"|"
+             r"\+\((0[1-9]|[1-9]\d)\)-(00[1-9]|0[1-9]\d|[1-9]\d\d)-"
+             r"(00[1-9]|0[1-9]\d|[1-9]\d\d)-"
+             r"(000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d)"
+             r"|"
+             r"\+(0[1-9]|[1-9]\d)-(00[1-9]|0[1-9]\d|[1-9]\d\d)-"
+             r"(00[1-9]|0[1-9]\d|[1-9]\d\d)-"
+             r"(000[1-9]|00[1-9]\d|0[1-9]\d\d|[1-9]\d\d\d)")
+
+
+DETECTORS = {}
+
+
+def register_detector(name, pattern):
+    """Registers a detector, or replaces the one registered under the
+    same name.
+
+    Arguments:
+        name (str):
+            Name of detector, written as the type of its matches. Must
+            be a valid Python identifier.
+        pattern (str):
+            Regular expression matched against the bytes of files,
+            without boundaries. It must not contain named groups, or
+            backreferences by number.
+
+    Raises:
+        ValueError:
+            If 'name' is not a valid identifier, or 'pattern' contains
+            named groups, or does not compile, alone or as compiled by
+            :func: ``compile_detectors``.
+    """
+    if not name.isidentifier():
+        raise ValueError(f'Detector name {name!r} is not a valid identifier.')
+    try:
+        regex = re.compile(pattern.encode())
+        if regex.groupindex:
+            raise ValueError(f'Pattern of detector {name!r} contains named groups: '
+                             f'{", ".join(regex.groupindex)}')
+        compile_detectors({name: pattern})
+    except re.error as error:
+        raise ValueError(f'Pattern of detector {name!r} does not compile: {error}')
+    DETECTORS[name] = pattern
+
+
+def compile_detectors(detectors):
+    """Compiles detectors into a single pattern.
+
+    Arguments:
+        detectors (dict):
+            Maps names of detectors to their patterns.
+
+    Returns:
+        (re.Pattern):
+            Pattern over bytes in which the match of each detector is
+            captured by a group named after it.
+    """
+    alternatives = '|'.join(rf"(?P<{name}>{pattern})" for name, pattern in detectors.items())
+    return re.compile(rf"(?<!\S)(?:{alternatives})(?!\S)".encode())
+
+
+register_detector('ssn', SSN)
+register_detector('tno', TELEPHONE)
+
+
+def compile_delimited(pattern):
+    """Compiles a pattern whose matches are preceded and followed by
+    whitespace, or by the start or end of a line. Unlike in
+    :func: ``compile_detectors``, the surrounding whitespace is part of
+    each match, so identifiers separated by a single whitespace
+    character compete for it.
+
+    Arguments:
+        pattern (str):
+            Regular expression, without boundaries.
+
+    Returns:
+        (re.Pattern):
+            Pattern over bytes, in multiline mode.
+    """
+    return re.compile(rf"(\s|^)({pattern})(\s|$)".encode(), re.M)
+
+
+def _is_binary(path, size=8000):
+    """Returns True if the first 'size' bytes of a file contain a NUL
+    byte, as binary files, e.g. compiled code or PDF documents, usually
+    do and text files do not.
+    """
+    with open(path, 'rb') as input_file:
+        return b'\0' in input_file.read(size)
+
+
+def expand_paths(paths):
+    """Expands directories, recursively, and glob patterns in 'paths'.
+    Paths without any match are kept as is, so that missing files raise
+    an error when opened. Binary files found in directories, see
+    :func: ``_is_binary``, are skipped; files named explicitly, or
+    matched by a pattern, are always scanned.
+
+    Arguments:
+        paths (list):
+            List of file paths, directories, or glob patterns.
+
+    Returns:
+        expanded (list):
+            List of file paths, in sorted order for each directory or
+            pattern.
+    """
+    expanded = []
+    for path in paths:
+        matches = sorted(glob.glob(path, recursive=True)) or [path]
+        for match in matches:
+            if not os.path.isdir(match):
+                expanded.append(match)
+                continue
+            for root, dirs, files in os.walk(match):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    if not _is_binary(file_path):
+                        expanded.append(file_path)
+    return expanded
+
+
+def scan_file(path, regex):
+    """Scans a memory-mapped file with a compiled set of detectors.
+
+    Arguments:
+        path (str):
+            Path to file.
+        regex (re.Pattern):
+            Pattern returned by :func: ``compile_detectors`` or
+            :func: ``compile_delimited``.
+
+    Yields:
+        (tuple):
+            Byte offset, type, i.e. name of detector, or None if the
+            pattern has no named groups, and value of each match, in
+            order of offset.
+    """
+    with open(path, 'rb') as input_file:
+        if os.fstat(input_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as text:
+            for match in regex.finditer(text):
+                yield match.start(), match.lastgroup, match.group().decode('utf-8', 'replace')
+
+
+_regex = None
+
+
+def _initialize_worker(detectors):
+    global _regex
+    _regex = compile_detectors(detectors)
+
+
+def _scan_file(path):
+    return path, list(scan_file(path, _regex))
+
+
+def _write_matches(output_file, path, matches, counts):
+    """Writes the matches of a file as JSON lines, with keys file,
+    offset, type and value. The part of each line naming the file is
+    serialized once per file.
+    """
+    prefix = '{"file": %s, "offset": ' % json.dumps(path)
+    for offset, name, value in matches:
+        output_file.write(f'{prefix}{offset}, "type": "{name}", "value": {json.dumps(value)}}}\n')
+        counts[name] += 1
+
+
+def scan_paths(paths, output_path='-', detectors=None, num_workers=1):
+    """Scans files with all detectors in a single pass over each file,
+    and writes matches as JSON lines.
+
+    Arguments:
+        paths (list):
+            List of file paths, directories, or glob patterns.
+        output_path (str):
+            Path to output file, or '-' for standard output.
+        detectors (list or None):
+            Names of registered detectors to enable. If None, all are
+            enabled.
+        num_workers (int):
+            Number of worker processes. If 1, files are scanned in this
+            process, and matches are written as soon as they are found.
+            Otherwise, the matches of a file are written once it has
+            been scanned.
+
+    Returns:
+        (dict):
+            Number of files scanned, and number of matches of each
+            detector.
+
+    Raises:
+        ValueError:
+            If a detector is not registered.
+    """
+    detectors = list(DETECTORS) if detectors is None else detectors
+    unknown = [name for name in detectors if name not in DETECTORS]
+    if unknown:
+        raise ValueError(f'Unknown detectors: {", ".join(unknown)}')
+    detectors = {name: DETECTORS[name] for name in detectors}
+
+    files = expand_paths(paths)
+    counts = dict.fromkeys(detectors, 0)
+    output_file = sys.stdout if output_path == '-' else open(output_path, 'w')
+
+    pool = None
+    try:
+        if num_workers > 1:
+            pool = Pool(num_workers, initializer=_initialize_worker, initargs=(detectors,))
+            results = pool.imap(_scan_file, files)
+        else:
+            regex = compile_detectors(detectors)
+            results = ((path, scan_file(path, regex)) for path in files)
+
+        for path, matches in results:
+            _write_matches(output_file, path, matches, counts)
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if pool is not None:
+            # Stops the workers if a file could not be scanned or written
+            pool.terminate()
+        if output_file is not sys.stdout:
+            output_file.close()
+        else:
+            output_file.flush()
+
+    return {'files': len(files), 'matches': counts}
@@ -0,0 +1,205 @@
+"""
+Streaming corpus ingestion for N-gram models.
+
+Sentences are read lazily, in chunks of lines, from plain text or
+gzip-compressed files, given as paths or glob patterns. Only one chunk
+of raw lines is held in memory at a time, so memory during training is
+bounded by the size of the model rather than that of the corpus.
+
+Files can also be split into shards of lines by byte ranges, with
+:func: ``shard_ranges`` and :func: ``read_shard``, so that each shard is
+read by a different worker process (see 'parallel.py'). Homework-3
+shards its tagged corpus with them as well.
+
+Corpora with many repeated lines can instead be deduplicated before
+counting, with :func: ``weighted_sentences``. Each unique line is then
+preprocessed, and counted, only once, with its multiplicity as weight.
+"""
+
+
+import os
+import re
+import gzip
+import glob
+from collections import Counter
+
+
+def preprocess(sentence):
+    """Preprocesses sentence based on recommendations in assignment.
+    """
+    sentence = sentence.rstrip('\n').rstrip()
+    tokens = re.split(r'\s', sentence)
+    tokens = [token.split('_')[0].lower() for token in tokens]
+    return tokens
+
+
+def expand_paths(paths):
+    """Expands glob patterns in 'paths'. Paths without any match are
+    kept as is, so that missing files raise an error when opened.
+
+    Arguments:
+        paths (str or list):
+            Path, glob pattern, or list of either.
+
+    Returns:
+        expanded (list):
+            List of file paths, in sorted order for each pattern.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+
+    expanded = []
+    for path in paths:
+        matches = sorted(glob.glob(path))
+        expanded.extend(matches if matches else [path])
+    return expanded
+
+
+def open_text(path):
+    """Opens a plain text or gzip-compressed ('.gz') file for reading.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path, 'r')
+
+
+def shard_ranges(path, num_shards):
+    """Splits a file into byte ranges of roughly equal size.
+
+    Gzip-compressed files cannot be split at arbitrary byte offsets,
+    thus they form a single shard.
+
+    Arguments:
+        path (str):
+            Path to file.
+        num_shards (int):
+            Number of shards to split the file into.
+
+    Returns:
+        (list):
+            List of (path, start, end) byte ranges. End is None for
+            gzip-compressed files.
+    """
+    if path.endswith('.gz'):
+        return [(path, 0, None)]
+
+    size = os.path.getsize(path)
+    step = max(1, -(-size // num_shards))
+    return [(path, start, min(start + step, size))
+            for start in range(0, size, step)]
+
+
+def read_shard(path, start, end):
+    """Reads the lines whose first byte lies in [start, end).
+
+    Arguments:
+        path (str):
+            Path to file.
+        start (int):
+            First byte offset of the shard.
+        end (int or None):
+            Byte offset past the shard. If None, the whole file is read.
+
+    Yields:
+        (str):
+            Lines in shard.
+    """
+    if end is None:
+        with open_text(path) as input_file:
+            yield from input_file
+        return
+
+    with open(path, 'rb') as input_file:
+        if start > 0:
+            input_file.seek(start - 1)
+            input_file.readline()
+
+        while input_file.tell() < end:
+            line = input_file.readline()
+            if not line:
+                break
+            yield line.decode('utf-8')
+
+
+def read_chunks(paths, chunk_size=10000):
+    """Reads lines from files in chunks.
+
+    Arguments:
+        paths (str or list):
+            Path, glob pattern, or list of either.
+        chunk_size (int):
+            Maximum number of lines in a chunk.
+
+    Yields:
+        chunk (list):
+            List of raw lines.
+    """
+    chunk = []
+    for path in expand_paths(paths):
+        with open_text(path) as input_file:
+            for line in input_file:
+                chunk.append(line)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_sentences(paths, chunk_size=10000, preprocess_fn=preprocess):
+    """Lazily reads and preprocesses sentences from files.
+
+    Arguments:
+        paths (str or list):
+            Path, glob pattern, or list of either.
+        chunk_size (int):
+            Number of lines read from disk at a time.
+        preprocess_fn (callable):
+            Maps a raw line to a list of tokens.
+
+    Yields:
+        (list):
+            List of tokens in each sentence.
+    """
+    for chunk in read_chunks(paths, chunk_size):
+        for sentence in chunk:
+            yield preprocess_fn(sentence)
+
+
+def count_unique_lines(lines):
+    """Counts the multiplicity of each line, ignoring trailing whitespace.
+
+    Arguments:
+        lines (iterable):
+            Raw lines.
+
+    Returns:
+        (collections.Counter):
+            Maps each unique line to its multiplicity, in order of first
+            occurrence.
+    """
+    return Counter(line.rstrip() for line in lines)
+
+
+def weighted_sentences(paths, chunk_size=10000, preprocess_fn=preprocess):
+    """Reads lines from files, deduplicates them, and preprocesses each
+    unique line once. Memory is bounded by the number of unique lines.
+
+    Arguments:
+        paths (str or list):
+            Path, glob pattern, or list of either.
+        chunk_size (int):
+            Number of lines read from disk at a time.
+        preprocess_fn (callable):
+            Maps a raw line to a list of tokens.
+
+    Yields:
+        (tuple):
+            List of tokens in each unique sentence, and its multiplicity.
+    """
+    counts = Counter()
+    for chunk in read_chunks(paths, chunk_size):
+        counts.update(count_unique_lines(chunk))
+
+    for line, weight in counts.items():
+        yield preprocess_fn(line), weight
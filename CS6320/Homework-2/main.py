@@ -1,61 +1,149 @@
-import re
 import argparse
-from ngram import Bigram
-
-
-def preprocess(sentence):
-    """Preprocesses sentence based on recommendations in assignment.
-    """
-    sentence = sentence.rstrip('\n').rstrip()
-    tokens = re.split('\s', sentence)
-    tokens = [token.split('_')[0].lower() for token in tokens]
-    return tokens
+from ngram import Bigram, NGram
+from corpus import preprocess, stream_sentences, weighted_sentences
+from parallel import fit_parallel
+from sketch import HeavyHitters
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='CS6320: Homework 2')
     parser.add_argument('--smoothing', dest='smoothing', type=str,
-                        choices=['laplacian', 'good-turing'],
-                        help='Normalizing technique. Options are \'laplacian\' \
-                        and \'good-turing\'. If argument is not passed, no smoothing \
-                        is done.')
+                        choices=['laplacian', 'good-turing', 'simple-good-turing',
+                                 'kneser-ney'],
+                        help='Normalizing technique. Options are \'laplacian\', \
+                        \'good-turing\', \'simple-good-turing\' and \'kneser-ney\'. \
+                        If argument is not passed, no smoothing is done.')
+    parser.add_argument('--order', dest='order', type=int, default=3,
+                        help='Order of the N-gram model for \'kneser-ney\'.')
+    parser.add_argument('--k', dest='k', type=int, default=5,
+                        help='Cutoff count for \'simple-good-turing\'. N_c is smoothed \
+                        with a log-linear fit for counts from k onwards.')
+    parser.add_argument('--train-path', dest='train_paths', type=str, nargs='+',
+                        default=['train.txt'],
+                        help='Paths or glob patterns of training files. Files ending \
+                        in \'.gz\' are read as gzip-compressed text.')
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=10000,
+                        help='Number of lines read from training files at a time.')
+    parser.add_argument('--workers', dest='workers', type=int, default=1,
+                        help='Number of worker processes for training. If greater \
+                        than 1, training files are sharded by byte ranges and counted \
+                        in parallel.')
+    parser.add_argument('--dedup', dest='dedup', action='store_true',
+                        help='If passed, repeated training sentences are preprocessed \
+                        and counted once, weighted by their multiplicity.')
     parser.add_argument('--N', dest='N', type=int, default=20,
                         help='Top N word/bigram frequencies are printed.')
+    parser.add_argument('--approximate', dest='approximate', action='store_true',
+                        help='If passed, top N word/bigram frequencies are estimated \
+                        in a single pass with fixed memory, with a Count-Min Sketch \
+                        and Space-Saving heavy hitters, instead of fitting a model.')
+    parser.add_argument('--predict', dest='predict', type=str, nargs='+',
+                        help='Words for which the top N most probable next words are \
+                        printed.')
     parser.add_argument('--transform', dest='transform', action='store_true',
                         help='If passed, transforms sentence in \'test.txt\' according to \
                         the trained N-gram model.\n \
                         NOTE: Test sentence should follow WORD_POS format, as in \'train.txt\'.')
+    parser.add_argument('--evaluate', dest='evaluate', type=str, nargs='+',
+                        help='Paths or glob patterns of held-out files. If passed, \
+                        log-probability of the held-out sentences and corpus perplexity \
+                        are printed.')
+    parser.add_argument('--save-model', dest='save_model', type=str,
+                        help='Path to save the fitted bigram model to, in a compact \
+                        binary format.')
+    parser.add_argument('--load-model', dest='load_model', type=str,
+                        help='Path to a bigram model saved with \'--save-model\'. If \
+                        passed, the model is memory-mapped instead of being fit.')
+    parser.add_argument('--arpa', dest='arpa', type=str,
+                        help='Path to export the bigram model to, in ARPA format.')
     parser.add_argument('--debug', dest='debug', action='store_true',
     	                help='To debug output of :func: `transform`, pass this flag.')
 
     args = parser.parse_args()
 
-    with open('train.txt', 'r') as input_file:
-        sentences = input_file.readlines()
-
-    sent_tokens = [preprocess(sentence) for sentence in sentences]
-    
-    model = Bigram(smoothing=args.smoothing)
-    model.fit(sent_tokens)
-
-    sorted_unigram_counts = dict(sorted(model.unigram_counts.items(),
-                                         key=lambda item: item[1],
-                                         reverse=True))
-    sorted_bigram_counts = dict(sorted(model.bigram_counts.items(),
-                                       key=lambda item: item[1],
-                                       reverse=True))
-    if not args.transform:
+    if args.load_model:
+        ignored = [flag for flag, passed in [('--smoothing', args.smoothing),
+                                             ('--workers', args.workers > 1),
+                                             ('--dedup', args.dedup)] if passed]
+        if ignored:
+            parser.error(f'{", ".join(ignored)} cannot be used with --load-model, as the '
+                         f'model is loaded, with its own smoothing, rather than fit.')
+    elif args.smoothing == 'kneser-ney':
+        ignored = [flag for flag, passed in [('--save-model', args.save_model),
+                                             ('--arpa', args.arpa),
+                                             ('--predict', args.predict),
+                                             ('--workers', args.workers > 1),
+                                             ('--dedup', args.dedup)] if passed]
+        if ignored:
+            parser.error(f'{", ".join(ignored)} cannot be used with --smoothing kneser-ney, '
+                         f'which is only supported by the bigram model.')
+
+    if args.approximate:
+        capacity = max(10 * args.N, 1000)
+        unigrams, bigrams = HeavyHitters(capacity), HeavyHitters(capacity)
+        for tokens in stream_sentences(args.train_paths, chunk_size=args.chunk_size):
+            for token in tokens:
+                unigrams.add(token)
+            for bigram in zip(tokens, tokens[1:]):
+                bigrams.add(bigram)
+
+        print(f"Showing approximate Top-{args.N} word frequencies:")
+        print(dict(unigrams.top(args.N)))
+        print('')
+        print(f"Showing approximate Top-{args.N} bigram frequencies:")
+        print(dict(bigrams.top(args.N)))
+        raise SystemExit
+
+    if args.load_model:
+        model = Bigram.load(args.load_model)
+    elif args.smoothing == 'kneser-ney':
+        model = NGram(order=args.order)
+        model.fit(stream_sentences(args.train_paths, chunk_size=args.chunk_size))
+    elif args.workers > 1:
+        model = fit_parallel(args.train_paths, num_workers=args.workers,
+                             smoothing=args.smoothing, k=args.k, dedup=args.dedup)
+    elif args.dedup:
+        model = Bigram(smoothing=args.smoothing, k=args.k)
+        model.fit_weighted(weighted_sentences(args.train_paths, chunk_size=args.chunk_size))
+    else:
+        model = Bigram(smoothing=args.smoothing, k=args.k)
+        model.fit(stream_sentences(args.train_paths, chunk_size=args.chunk_size))
+
+    if isinstance(model, Bigram):
+        if args.save_model:
+            model.save(args.save_model)
+        if args.arpa:
+            model.to_arpa(args.arpa)
+
+    if args.predict and isinstance(model, Bigram):
+        predictions = model.predict_next_batch(args.predict, args.N)
+        for word, words in zip(args.predict, predictions):
+            print(f'Top-{args.N} next words for \'{word}\': {words}')
+
+    if not args.transform and not args.evaluate and not args.predict and isinstance(model, Bigram):
         print(f"Showing Top-{args.N} word frequencies:")
-        print(dict(zip(list(sorted_unigram_counts.keys())[:args.N],
-                       list(sorted_unigram_counts.values())[:args.N])))
+        print(dict(model.top_unigrams(args.N)))
         print('')
         print(f"Showing Top-{args.N} bigram frequencies:")
-        print(dict(zip(list(sorted_bigram_counts.keys())[:args.N],
-                       list(sorted_bigram_counts.values())[:args.N])))
+        print(dict(model.top_bigrams(args.N)))
+
+    elif not args.transform and not args.evaluate and not args.predict:
+        print('Top-N frequencies are only shown for the bigram model. '
+              'Pass \'--transform\' or \'--evaluate\' to score sentences.')
+
+    if args.evaluate:
+        log_probs, perplexity = model.evaluate(
+            stream_sentences(args.evaluate, chunk_size=args.chunk_size))
+        print(f'=> Number of held-out sentences = {len(log_probs)}')
+        print(f'=> Log-probability of held-out sentences = {sum(log_probs)}')
+        print(f'=> Perplexity of held-out sentences = {perplexity}')
 
     if args.transform:
         with open('test.txt', 'r') as input_file:
             sentence = input_file.readline()
         test_sent_tokens = preprocess(sentence)
         probability = model.transform(test_sent_tokens, args.debug)
-        print(f'=> Bigram probability of sentence = {probability}')
+        if isinstance(model, Bigram):
+            print(f'=> Bigram probability of sentence = {probability}')
+        else:
+            print(f'=> {args.order}-gram probability of sentence = {probability}')
@@ -1,5 +1,20 @@
 import math
-from collections import Counter
+import heapq
+from array import array
+from itertools import islice, chain
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from corpus import stream_sentences
+from persistence import write_sections, read_sections, write_meta, read_meta, \
+                        encode_strings, StringTable
+from storage import Vocabulary, BigramCounts, NGramTrie, UnigramView, \
+                    BigramView, pack, unpack, pack_ngram, SHIFT, MASK
+
+
+def _log(x):
+    return math.log(x) if x > 0 else float('-inf')
 
 
 class Bigram:
@@ -10,15 +25,57 @@ class Bigram:
         smoothing (str or None):
             If None, no smoothing is applied.
             If 'laplacian', add-one smoothing is applied.
-            If 'good-turing', good turing discounting is applied.           
-        unigram_counts (dict):
+            If 'good-turing', good turing discounting is applied.
+            If 'simple-good-turing', simple good turing discounting
+            is applied, i.e. N_c is smoothed with a log-linear fit
+            for counts from ``k`` onwards.
+        k (int):
+            Cutoff count for simple good turing discounting.
+        flush_size (int):
+            Number of distinct bigrams staged in a dictionary during
+            :func: ``fit``, before being merged into ``bigrams``.
+        vocabulary (storage.Vocabulary):
+            Interns each word in the training set to an integer id.
+        unigrams (array.array):
+            Count of each word, indexed by word id.
+        bigrams (storage.BigramCounts):
+            Counts of bigrams of word ids.
+        Nc (dict):
+            Maps each bigram count c to the number of bigrams N_c
+            occurring exactly c times.
+        N (int):
+            Total count of bigrams in the training set.
+        discounted (dict):
+            Maps each bigram count c to its discounted count c*.
+        log_unigrams (array.array):
+            Log-probability of each word, indexed by word id.
+        log_previous (array.array):
+            Log of the normalized count of each word as the previous
+            word of a bigram, indexed by word id.
+        log_bigrams (array.array):
+            Log of the normalized count of each bigram, parallel to
+            ``bigrams.keys``.
+        log_unseen (float):
+            Log of the normalized count of an unseen bigram.
+        row_offsets (array.array):
+            Position in ``bigrams.keys`` of the first bigram starting
+            with each word id, and the number of bigrams at the end.
+        successors (array.array):
+            Positions in ``bigrams.keys``, where the bigrams starting
+            with each word are sorted by decreasing probability.
+        cache_size (int):
+            Maximum number of history words whose predictions are
+            cached by :func: ``predict_next``.
+
+    Properties:
+        unigram_counts (storage.UnigramView):
             Dictionary of unigrams in the training set, and their
             corresponding counts.
-        bigram_counts (dict):
+        bigram_counts (storage.BigramView):
             Dictionary of bigrams in the training set, and their
             corresponding counts.
     """
-    def __init__(self, smoothing=None):
+    def __init__(self, smoothing=None, k=5, flush_size=1 << 20, cache_size=1024):
         """Initializes :class: ``Bigram``.
 
         Arguments:
@@ -26,75 +83,326 @@ class Bigram:
                 If None, no smoothing is applied.
                 If 'laplacian', add-one smoothing is applied.
                 If 'good-turing', good turing discounting is applied.
+                If 'simple-good-turing', simple good turing discounting
+                is applied.
+            k (int):
+                Cutoff count for simple good turing discounting.
+            flush_size (int):
+                Number of distinct bigrams staged during :func: ``fit``,
+                before being merged into the sorted arrays.
+            cache_size (int):
+                Maximum number of history words whose predictions are
+                cached by :func: ``predict_next``.
         """
-        self.unigram_counts = {}
-        self.bigram_counts = {}
+        self.vocabulary = Vocabulary()
+        self.unigrams = array('q')
+        self.bigrams = BigramCounts(first=array('q'))
         self.smoothing = smoothing
+        self.k = k
+        self.Nc = {}
+        self.N = 0
+        self.discounted = {}
+        self.log_unigrams = array('d')
+        self.log_previous = array('d')
+        self.log_bigrams = array('d')
+        self.log_unseen = float('-inf')
+        self.row_offsets = array('q', [0])
+        self.successors = array('q')
+        self.flush_size = flush_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._stale = False
+
+    @property
+    def unigram_counts(self):
+        return UnigramView(self.vocabulary, self.unigrams)
+
+    @property
+    def bigram_counts(self):
+        return BigramView(self.vocabulary, self.bigrams)
+
+    def _word_id(self, word):
+        word_id = self.vocabulary.lookup(word)
+        if word_id is None:
+            raise KeyError(word)
+        return word_id
+
+    def top_unigrams(self, k):
+        """Returns the k most frequent words, selected with a heap in
+        O(V log k) time, without sorting or copying all counts.
+
+        Returns:
+            (list):
+                List of (word, count), in decreasing order of count.
+        """
+        return heapq.nlargest(k, self.unigram_counts.items(), key=lambda item: item[1])
+
+    def top_bigrams(self, k):
+        """Returns the k most frequent bigrams, selected with a heap in
+        O(B log k) time, without sorting or copying all counts. Ties are
+        broken in order of first occurrence in the training set.
 
-    def _get_tokens_counts(self):
-        tokens = self.bigram_counts
-        tokens_counts = list(tokens.values())
-        return tokens_counts
+        Returns:
+            (list):
+                List of ((previous word, next word), count), in decreasing
+                order of count.
+        """
+        keys, counts = self.bigrams.keys, self.bigrams.counts
+        first = self.bigrams.first
+        if first is None:
+            first = range(len(keys))
+        positions = heapq.nlargest(k, range(len(keys)), key=lambda i: (counts[i], -first[i]))
+
+        word = self.vocabulary.word
+        top = []
+        for position in positions:
+            prev_id, next_id = unpack(keys[position])
+            top.append(((word(prev_id), word(next_id)), counts[position]))
+        return top
 
     def _get_Nc(self, count):
-        tokens_counts = self._get_tokens_counts()
-        if tokens_counts.count(count) == 0:
+        Nc = self.Nc.get(count, 0)
+        if Nc == 0:
             Nc = 1
-        else:
-            Nc = tokens_counts.count(count)
         return Nc
 
     def _get_Nc_plus_1(self, count):
-        tokens_counts = self._get_tokens_counts()
-        Nc_plus_1 = tokens_counts.count(count + 1)
-        return Nc_plus_1
+        return self.Nc.get(count + 1, 0)
 
     def _get_N(self):
-        tokens_counts = self._get_tokens_counts()
-        return sum(tokens_counts)
+        return self.N
+
+    def _fit_log_linear(self):
+        """Fits the log-linear regression log(Z_c) = a + b * log(c) used
+        by Simple Good-Turing, where Z_c averages N_c over the gap to
+        the neighbouring non-zero counts.
+
+        Returns:
+            (tuple):
+                Intercept 'a' and slope 'b' of the regression line.
+        """
+        counts = sorted(self.Nc)
+        if not counts:
+            return 0.0, 0.0
+        if len(counts) == 1:
+            return math.log(self.Nc[counts[0]]), 0.0
+
+        log_c, log_z = [], []
+        for i, c in enumerate(counts):
+            q = counts[i - 1] if i > 0 else 0
+            t = counts[i + 1] if i < len(counts) - 1 else 2 * c - q
+            log_c.append(math.log(c))
+            log_z.append(math.log(self.Nc[c] / (0.5 * (t - q))))
+
+        mean_x = sum(log_c) / len(log_c)
+        mean_y = sum(log_z) / len(log_z)
+        sxx = sum((x - mean_x) ** 2 for x in log_c)
+        sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(log_c, log_z))
+        b = sxy / sxx
+        return mean_y - b * mean_x, b
+
+    def _get_smoothed_Nc(self, count, coefficients):
+        """Log-linear smoothed N_c used by Simple Good-Turing from cutoff
+        ``k`` onwards, where N_c is sparse and noisy.
+        """
+        a, b = coefficients
+        return math.exp(a + b * math.log(count))
+
+    def _compute_discounted_counts(self):
+        """Precomputes the frequency-of-frequencies table N_c, the total
+        bigram count N and the discounted count c* for every observed
+        count c, so that scoring a bigram is a single lookup.
+        """
+        self.Nc = dict(Counter(self.bigrams.counts))
+        self.N = sum(self.bigrams.counts)
+        self.discounted = {}
+
+        if self.smoothing == 'good-turing':
+            for count in [0] + list(self.Nc):
+                self.discounted[count] = (count + 1) * self._get_Nc_plus_1(count) \
+                                         / self._get_Nc(count)
+        elif self.smoothing == 'simple-good-turing':
+            # N_c and N_{c+1} are both raw below the cutoff, and both
+            # smoothed from it onwards, so that c* does not mix the two
+            coefficients = self._fit_log_linear()
+            self.discounted[0] = self._get_Nc_plus_1(0)
+            for count in self.Nc:
+                if count < self.k:
+                    self.discounted[count] = (count + 1) * self._get_Nc_plus_1(count) \
+                                             / self._get_Nc(count)
+                else:
+                    self.discounted[count] = (count + 1) \
+                        * self._get_smoothed_Nc(count + 1, coefficients) \
+                        / self._get_smoothed_Nc(count, coefficients)
+
+    def discounted_counts(self, counts):
+        """Looks up discounted counts c* for a batch of raw bigram counts.
+
+        Arguments:
+            counts (iterable):
+                Raw bigram counts.
+
+        Returns:
+            (list):
+                Discounted count c* for each raw count. Raw counts are
+                returned unchanged, if smoothing is not Good-Turing.
+        """
+        self._ensure_tables()
+        table = self.discounted
+        return [table.get(count, count) for count in counts]
 
     def _normalize_bigram(self, count):
         if self.smoothing is None:
             return count
         elif self.smoothing == 'laplacian':
             return count + 1
-        elif self.smoothing == 'good-turing':
-            c_star = (count + 1) * self._get_Nc_plus_1(count) \
-                                   / self._get_Nc(count)
-            prob_gt = c_star / self._get_N()
-            return prob_gt
+        elif self.smoothing in ('good-turing', 'simple-good-turing'):
+            if self.N == 0:
+                # Without bigrams, no mass is left to discount
+                return 0
+            return self.discounted.get(count, count) / self.N
 
     def _normalize_previous(self, count):
         if self.smoothing is None:
             return count
         elif self.smoothing == 'laplacian':
-            return count + len(self.unigram_counts)
-        elif self.smoothing == 'good-turing':
+            return count + len(self.vocabulary)
+        elif self.smoothing in ('good-turing', 'simple-good-turing'):
             return 1
 
+    def _compute_log_tables(self):
+        """Precomputes log-probability tables, so that scoring a sentence
+        is a sum of table lookups.
+        """
+        total = sum(self.unigrams)
+        self.log_unigrams = array('d', [_log(count / total) for count in self.unigrams])
+        self.log_previous = array('d', [_log(self._normalize_previous(count))
+                                        for count in self.unigrams])
+        self.log_bigrams = array('d', [_log(self._normalize_bigram(count))
+                                       for count in self.bigrams.counts])
+        self.log_unseen = _log(self._normalize_bigram(0))
+
+    def _compute_successors(self):
+        """Precomputes, for each history word, its successors sorted by
+        decreasing probability, in one contiguous array.
+        """
+        self.row_offsets = array('q', [0] * (len(self.unigrams) + 1))
+        for key in self.bigrams.keys:
+            self.row_offsets[(key >> SHIFT) + 1] += 1
+        for word_id in range(len(self.unigrams)):
+            self.row_offsets[word_id + 1] += self.row_offsets[word_id]
+
+        self.successors = array('q')
+        log_bigrams = self.log_bigrams
+        for word_id in range(len(self.unigrams)):
+            start, end = self.row_offsets[word_id], self.row_offsets[word_id + 1]
+            self.successors.extend(sorted(range(start, end),
+                                          key=lambda i: (-log_bigrams[i], i)))
+
+    def _ensure_tables(self):
+        if self._stale:
+            self._compute_discounted_counts()
+            self._compute_log_tables()
+            self._compute_successors()
+            self._cache.clear()
+            self._stale = False
+
+    def partial_fit_weighted(self, weighted_sentences):
+        """Updates counts of the bigram model with weighted sentences,
+        i.e. a sentence with weight w is counted as w copies of itself.
+
+        Discounted counts are recomputed lazily, on the next scoring
+        call, so that many batches can be added at the cost of one
+        recomputation.
+
+        Arguments:
+            weighted_sentences (iterable):
+                Pairs of a sentence, represented as a list of tokens,
+                and its weight. May be a generator, which is consumed
+                lazily.
+        """
+        staged = Counter()
+        for each, weight in weighted_sentences:
+            ids = self.vocabulary.encode(each)
+            if len(self.unigrams) < len(self.vocabulary):
+                self.unigrams.extend([0] * (len(self.vocabulary) - len(self.unigrams)))
+            for word_id in ids:
+                self.unigrams[word_id] += weight
+
+            for i in range(1, len(ids)):
+                staged[pack(ids[i - 1], ids[i])] += weight
+            if len(staged) >= self.flush_size:
+                self.bigrams.update(staged)
+                staged.clear()
+
+        self.bigrams.update(staged)
+        self._stale = True
+        return self
+
+    def partial_fit(self, sentence_tokens):
+        """Updates counts of the bigram model with more sentences.
+
+        Arguments:
+            sentence_tokens (iterable):
+                Sentences, represented as a list of tokens. May be a
+                generator, which is consumed lazily.
+        """
+        return self.partial_fit_weighted((each, 1) for each in sentence_tokens)
+
+    def fit_weighted(self, weighted_sentences):
+        """Fit bigram model on weighted sentences, e.g. as produced by
+        :func: ``corpus.weighted_sentences``.
+
+        Arguments:
+            weighted_sentences (iterable):
+                Pairs of a sentence, represented as a list of tokens,
+                and its weight.
+        """
+        self.partial_fit_weighted(weighted_sentences)
+        self._ensure_tables()
+        return self
+
     def fit(self, sentence_tokens):
         """Fit bigram model.
 
         Arguments:
-            sentence_tokens (list):
-                List of sentences, represented as a list of tokens.
+            sentence_tokens (iterable):
+                Sentences, represented as a list of tokens. May be a
+                generator, which is consumed lazily.
         """
-        for each in sentence_tokens:
-            unigram_counts = dict(Counter(each))
-            for x in unigram_counts:
-                if x in self.unigram_counts:
-                    self.unigram_counts[x] += unigram_counts[x]
-                else:
-                    self.unigram_counts[x] = unigram_counts[x]
+        self.partial_fit(sentence_tokens)
+        self._ensure_tables()
+        return self
 
-            bigrams = [(each[i - 1], each[i]) for i in range(1, len(each))]
-            bigram_counts = dict(Counter(bigrams))
+    def merge(self, other):
+        """Adds the counts of another bigram model to this model.
 
-            for x in bigram_counts:
-                if x in self.bigram_counts:
-                    self.bigram_counts[x] += bigram_counts[x]
-                else:
-                    self.bigram_counts[x] = bigram_counts[x]
+        Arguments:
+            other (ngram.Bigram):
+                Bigram model, possibly fit with a different vocabulary.
+        """
+        id_map = self.vocabulary.encode(other.vocabulary)
+        if len(self.unigrams) < len(self.vocabulary):
+            self.unigrams.extend([0] * (len(self.vocabulary) - len(self.unigrams)))
+        for other_id, count in enumerate(other.unigrams):
+            self.unigrams[id_map[other_id]] += count
+
+        # Bigrams are staged in order of first occurrence in 'other', so
+        # that new bigrams are ranked after those of this model
+        positions = range(len(other.bigrams))
+        if other.bigrams.first is not None:
+            positions = sorted(positions, key=other.bigrams.first.__getitem__)
+
+        staged = {}
+        for position in positions:
+            prev_id, next_id = unpack(other.bigrams.keys[position])
+            staged[pack(id_map[prev_id], id_map[next_id])] = other.bigrams.counts[position]
+            if len(staged) >= self.flush_size:
+                self.bigrams.update(staged)
+                staged.clear()
+
+        self.bigrams.update(staged)
+        self._stale = True
         return self
 
     def transform(self, sentence_tokens, debug=False):
@@ -109,28 +417,552 @@ class Bigram:
             prob (float):
                 Bigram probability with/without smoothing.
         """
-        bigrams = [(sentence_tokens[i - 1], sentence_tokens[i]) \
-                   for i in range(1, len(sentence_tokens))]
-        prob = self.unigram_counts[sentence_tokens[0]] \
-                    / sum(list(self.unigram_counts.values()))
+        self._ensure_tables()
+        ids = [self.vocabulary.lookup(token) for token in sentence_tokens]
+        prob = self.unigrams[self._word_id(sentence_tokens[0])] / sum(self.unigrams)
 
-        debug_string = f'P({sentence_tokens[0]})'
-        debug_op_string = f'{prob}'
+        if debug:
+            debug_string = f'P({sentence_tokens[0]})'
+            debug_op_string = f'{prob}'
 
-        for bigram in bigrams:
-            if bigram not in self.bigram_counts:
-                numerator = self._normalize_bigram(0)
+        for i in range(1, len(ids)):
+            if ids[i - 1] is None or ids[i] is None:
+                count = 0
             else:
-                numerator = self._normalize_bigram(self.bigram_counts[bigram])
-            denominator =  self._normalize_previous(self.unigram_counts[bigram[0]])
+                count = self.bigrams.get(ids[i - 1], ids[i])
+            numerator = self._normalize_bigram(count)
+            denominator = self._normalize_previous(
+                self.unigrams[self._word_id(sentence_tokens[i - 1])])
             bigram_prob = numerator / denominator
             prob = prob * bigram_prob
 
-            debug_string += f' * P({bigram[1]} | {bigram[0]})'
-            debug_op_string += f' * {bigram_prob}'
+            if debug:
+                debug_string += f' * P({sentence_tokens[i]} | {sentence_tokens[i - 1]})'
+                debug_op_string += f' * {bigram_prob}'
 
         if debug:
             print(f"Sentence: {' '.join(sentence_tokens)}")
             print(f'Bigram probability of sentence = {debug_string}')
             print(f'=> Bigram probability of sentence = {debug_op_string}')
         return prob
+
+    def log_probabilities(self, sentence_tokens):
+        """Computes natural log of the bigram probability for a batch of
+        sentences, from precomputed log tables. Unlike :func: ``transform``,
+        long sentences do not underflow to 0.
+
+        Arguments:
+            sentence_tokens (iterable):
+                Sentences, represented as a list of tokens.
+
+        Returns:
+            log_probs (list):
+                Log-probability of each sentence. Sentences containing
+                out-of-vocabulary words have log-probability -inf.
+        """
+        self._ensure_tables()
+        lookup = self.vocabulary.lookup
+        sentence_ids = [list(map(lookup, tokens)) for tokens in sentence_tokens]
+        log_probs = np.full(len(sentence_ids), -np.inf)
+
+        valid = [index for index, ids in enumerate(sentence_ids) if ids and None not in ids]
+        if not valid:
+            return log_probs.tolist()
+        lengths = np.array([len(sentence_ids[index]) for index in valid], dtype=np.int64)
+        ids = np.fromiter(chain.from_iterable(sentence_ids[index] for index in valid),
+                          dtype=np.int64, count=int(lengths.sum()))
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+        # Bigrams are all pairs of consecutive ids, but those crossing
+        # from one sentence to the next, and their positions are found by
+        # binary search over the sorted packed keys.
+        within = np.ones(len(ids) - 1, dtype=bool)
+        within[starts[1:] - 1] = False
+        previous, following = ids[:-1][within], ids[1:][within]
+        keys = (previous << SHIFT) | following
+
+        bigram_keys = np.frombuffer(self.bigrams.keys, dtype=np.int64)
+        if len(bigram_keys):
+            positions = np.minimum(np.searchsorted(bigram_keys, keys), len(bigram_keys) - 1)
+            log_bigrams = np.frombuffer(self.log_bigrams, dtype=np.float64)
+            terms = np.where(bigram_keys[positions] == keys, log_bigrams[positions], self.log_unseen)
+        else:
+            terms = np.full(len(keys), self.log_unseen)
+        terms -= np.frombuffer(self.log_previous, dtype=np.float64)[previous]
+
+        sentences = np.repeat(np.arange(len(valid)), lengths - 1)
+        log_probs[valid] = np.frombuffer(self.log_unigrams, dtype=np.float64)[ids[starts]] + \
+                           np.bincount(sentences, weights=terms, minlength=len(valid))
+        return log_probs.tolist()
+
+    def evaluate(self, sentences, batch_size=10000):
+        """Scores a held-out set of sentences.
+
+        Arguments:
+            sentences (str or iterable):
+                Path or glob pattern of a file, from which sentences
+                are streamed. Otherwise, an iterable of sentences,
+                represented as a list of tokens.
+            batch_size (int):
+                Number of sentences scored at a time by
+                :func: ``log_probabilities``.
+
+        Returns:
+            log_probs (list):
+                Log-probability of each sentence.
+            perplexity (float):
+                Corpus perplexity, i.e. exp of the negative mean
+                log-probability per token.
+        """
+        if isinstance(sentences, str):
+            sentences = stream_sentences(sentences)
+
+        log_probs, num_tokens = [], 0
+        sentences = iter(sentences)
+        while True:
+            batch = list(islice(sentences, batch_size))
+            if not batch:
+                break
+            log_probs.extend(self.log_probabilities(batch))
+            num_tokens += sum(len(tokens) for tokens in batch)
+
+        if num_tokens == 0:
+            return log_probs, float('inf')
+        perplexity = math.exp(-sum(log_probs) / num_tokens) \
+                     if float('-inf') not in log_probs else float('inf')
+        return log_probs, perplexity
+
+
+    def _predict_next(self, word_id, k):
+        cached = self._cache.get(word_id)
+        if cached is not None and cached[0] >= k:
+            self._cache.move_to_end(word_id)
+            return cached[1][:k]
+
+        start, end = self.row_offsets[word_id], self.row_offsets[word_id + 1]
+        log_previous = self.log_previous[word_id]
+        predictions = []
+        for position in self.successors[start:min(end, start + k)]:
+            next_id = self.bigrams.keys[position] & MASK
+            prob = math.exp(self.log_bigrams[position] - log_previous)
+            predictions.append((self.vocabulary.word(next_id), prob))
+
+        self._cache[word_id] = (k, predictions)
+        self._cache.move_to_end(word_id)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return predictions
+
+    def predict_next(self, prefix_word, k=5):
+        """Predicts the k most probable words following 'prefix_word',
+        among the words seen following it in the training set.
+
+        Successors are ranked once, when the model is fit, thus a lookup
+        costs O(k). Predictions for recently queried words are served
+        from an LRU cache.
+
+        Arguments:
+            prefix_word (str):
+                History word.
+            k (int):
+                Number of predictions.
+
+        Returns:
+            (list):
+                List of (word, probability), in decreasing order of
+                probability. Empty, if 'prefix_word' is not in the
+                vocabulary.
+        """
+        self._ensure_tables()
+        word_id = self.vocabulary.lookup(prefix_word)
+        if word_id is None:
+            return []
+        return self._predict_next(word_id, k)
+
+    def predict_next_batch(self, prefix_words, k=5):
+        """Predicts the k most probable words following each word in
+        'prefix_words'.
+
+        Returns:
+            (list):
+                List of predictions for each word, as returned by
+                :func: ``predict_next``.
+        """
+        self._ensure_tables()
+        lookup = self.vocabulary.lookup
+        return [[] if word_id is None else self._predict_next(word_id, k)
+                for word_id in map(lookup, prefix_words)]
+
+    def save(self, path):
+        """Saves the fitted model in a compact binary format, see
+        :mod: ``persistence``. Precomputed discount and log tables are
+        saved as well, so that a loaded model can score immediately.
+
+        Arguments:
+            path (str):
+                Path to model file.
+        """
+        self._ensure_tables()
+        vocab_offsets, vocab_data, vocab_order = encode_strings(self.vocabulary)
+        meta = {'smoothing': self.smoothing, 'k': self.k, 'N': self.N,
+                'log_unseen': self.log_unseen}
+
+        sections = {
+            'meta': write_meta(meta),
+            'vocab_offsets': vocab_offsets,
+            'vocab_data': vocab_data,
+            'vocab_order': vocab_order,
+            'unigrams': array('q', self.unigrams),
+            'bigram_keys': array('q', self.bigrams.keys),
+            'bigram_counts': array('q', self.bigrams.counts),
+            'nc_counts': array('q', self.Nc.keys()),
+            'nc_values': array('q', self.Nc.values()),
+            'disc_counts': array('q', self.discounted.keys()),
+            'disc_values': array('d', self.discounted.values()),
+            'log_unigrams': array('d', self.log_unigrams),
+            'log_previous': array('d', self.log_previous),
+            'log_bigrams': array('d', self.log_bigrams),
+            'row_offsets': array('q', self.row_offsets),
+            'successors': array('q', self.successors),
+        }
+        if self.bigrams.first is not None:
+            sections['bigram_first'] = array('q', self.bigrams.first)
+        write_sections(path, 'bigram', sections)
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        """Loads a model saved with :func: ``save``.
+
+        Arguments:
+            path (str):
+                Path to model file.
+            use_mmap (bool):
+                If True, counts and tables are memoryviews over the
+                memory-mapped file, paged in lazily, and the model is
+                read-only, i.e. it can not be fit further. Otherwise,
+                they are copied into memory.
+
+        Returns:
+            model (ngram.Bigram):
+                Fitted bigram model.
+        """
+        sections = read_sections(path, 'bigram', use_mmap)
+        meta = read_meta(sections['meta'])
+
+        model = cls(smoothing=meta['smoothing'], k=meta['k'])
+        vocabulary = StringTable(sections['vocab_offsets'], sections['vocab_data'],
+                                 sections['vocab_order'])
+        if use_mmap:
+            model.vocabulary = vocabulary
+        else:
+            model.vocabulary = Vocabulary(vocabulary)
+
+        model.unigrams = sections['unigrams']
+        model.bigrams = BigramCounts(sections['bigram_keys'], sections['bigram_counts'],
+                                     sections.get('bigram_first'))
+        model.N = meta['N']
+        model.Nc = dict(zip(sections['nc_counts'], sections['nc_values']))
+        model.discounted = dict(zip(sections['disc_counts'],
+                                    sections['disc_values']))
+        model.log_unigrams = sections['log_unigrams']
+        model.log_previous = sections['log_previous']
+        model.log_bigrams = sections['log_bigrams']
+        model.row_offsets = sections['row_offsets']
+        model.successors = sections['successors']
+        model.log_unseen = meta['log_unseen']
+        model._stale = False
+        return model
+
+    def to_arpa(self, path):
+        """Exports the model in ARPA format.
+
+        Seen bigrams are stored with their probability under the model.
+        Unseen bigrams back off to the unigram probability, with a weight
+        which normalizes the remaining probability mass of each history,
+        so that smoothed probabilities of unseen bigrams are approximated.
+
+        Arguments:
+            path (str):
+                Path to ARPA file.
+        """
+        self._ensure_tables()
+        log10 = math.log(10)
+        word = self.vocabulary.word
+
+        def _format(log_prob):
+            return f'{log_prob / log10:.6f}' if log_prob > float('-inf') else '-99'
+
+        backoff = {}
+        for prev_id in range(len(self.unigrams)):
+            start, end = self.bigrams.row(prev_id)
+            if start == end:
+                continue
+            seen = sum(math.exp(self.log_bigrams[i] - self.log_previous[prev_id])
+                       for i in range(start, end))
+            seen_unigrams = sum(math.exp(self.log_unigrams[self.bigrams.keys[i] & MASK])
+                                for i in range(start, end))
+            if seen < 1 and seen_unigrams < 1:
+                backoff[prev_id] = math.log((1 - seen) / (1 - seen_unigrams))
+            else:
+                backoff[prev_id] = float('-inf')
+
+        with open(path, 'w') as output_file:
+            output_file.write('\\data\\\n')
+            output_file.write(f'ngram 1={len(self.unigrams)}\n')
+            output_file.write(f'ngram 2={len(self.bigrams)}\n\n')
+
+            output_file.write('\\1-grams:\n')
+            for word_id, log_prob in enumerate(self.log_unigrams):
+                line = f'{_format(log_prob)}\t{word(word_id)}'
+                if word_id in backoff:
+                    line += f'\t{_format(backoff[word_id])}'
+                output_file.write(line + '\n')
+
+            output_file.write('\n\\2-grams:\n')
+            for i, (prev_id, next_id, _) in enumerate(self.bigrams.items()):
+                log_prob = self.log_bigrams[i] - self.log_previous[prev_id]
+                output_file.write(f'{_format(log_prob)}\t{word(prev_id)} {word(next_id)}\n')
+            output_file.write('\n\\end\\\n')
+
+
+class NGram:
+    """Fits an N-gram model of configurable order with interpolated
+    modified Kneser-Ney smoothing (Chen & Goodman), and computes the
+    probability of a given sentence.
+
+    Each sentence is padded with N - 1 start symbols ``<s>`` and an end
+    symbol ``</s>``. Counts are stored in a :class: ``storage.NGramTrie``.
+    N-grams of the highest order keep their raw counts, while lower
+    orders keep continuation counts, i.e. the number of distinct words
+    preceding them, except for N-grams starting with ``<s>``.
+
+    Parameters:
+        order (int):
+            Order N of the model.
+        vocabulary (storage.Vocabulary):
+            Interns each word in the training set to an integer id.
+        trie (storage.NGramTrie):
+            Raw or continuation counts of N-grams of orders 1 to N.
+        discounts (list):
+            Discounts (D1, D2, D3+) for each order.
+        totals (list):
+            For each order k < N, sum of counts of the children of each
+            node at order k, i.e. of the N-grams extending a context.
+        gammas (list):
+            For each order k < N, discounted mass of the children of each
+            node at order k, which is interpolated with the lower order.
+    """
+    BOS, EOS = '<s>', '</s>'
+
+    def __init__(self, order=3):
+        """Initializes :class: ``NGram``.
+
+        Arguments:
+            order (int):
+                Order N of the model.
+        """
+        self.order = order
+        self.vocabulary = Vocabulary([self.BOS, self.EOS])
+        self.trie = None
+        self.discounts = []
+        self.totals = []
+        self.gammas = []
+
+    def _pad(self, ids):
+        bos, eos = self.vocabulary.lookup(self.BOS), self.vocabulary.lookup(self.EOS)
+        return [bos] * (self.order - 1) + ids + [eos]
+
+    @staticmethod
+    def _compute_discounts(counts):
+        """Computes modified Kneser-Ney discounts from the counts of
+        N-grams with count 1 to 4.
+        """
+        n = Counter(count for count in counts if count <= 4)
+        n1, n2, n3, n4 = n[1], n[2], n[3], n[4]
+        if n1 == 0 or n2 == 0:
+            return 0.5, 1.0, 1.5
+
+        y = n1 / (n1 + 2 * n2)
+        d1 = 1 - 2 * y * n2 / n1
+        d2 = 2 - 3 * y * n3 / n2
+        d3 = 3 - 4 * y * n4 / n3 if n3 else d2
+        return max(d1, 0.0), max(d2, 0.0), max(d3, 0.0)
+
+    def _discount(self, index, count):
+        if count == 0:
+            return 0
+        return self.discounts[index][min(count, 3) - 1]
+
+    def fit(self, sentence_tokens):
+        """Fit N-gram model.
+
+        Arguments:
+            sentence_tokens (iterable):
+                Sentences, represented as a list of tokens. May be a
+                generator, which is consumed lazily.
+        """
+        raw = [Counter() for _ in range(self.order)]
+        for each in sentence_tokens:
+            ids = self._pad(self.vocabulary.encode(each))
+            for k in range(self.order):
+                raw[k].update(pack_ngram(ids[i:i + k + 1])
+                              for i in range(len(ids) - k))
+
+        bos = self.vocabulary.lookup(self.BOS)
+        counts = [None] * self.order
+        counts[-1] = raw[-1]
+        for k in range(self.order - 1, 0, -1):
+            suffix_mask = (1 << (SHIFT * k)) - 1
+            continuation = Counter(key & suffix_mask for key in raw[k])
+            shift = SHIFT * (k - 1)
+            # N-grams ending with <s> are kept, as prefixes of padded
+            # N-grams, but with count 0, since <s> is never predicted.
+            counts[k - 1] = {key: 0 if key & MASK == bos else
+                             count if key >> shift == bos else continuation[key]
+                             for key, count in raw[k - 1].items()}
+            raw[k] = None
+
+        self.trie = NGramTrie.from_counts(len(self.vocabulary), counts)
+        del counts, raw
+
+        self.discounts = [self._compute_discounts(self.trie.unigrams)] + \
+                         [self._compute_discounts(level.counts) for level in self.trie.levels]
+
+        self.unigram_total = sum(self.trie.unigrams)
+        self.unigram_gamma = sum(self._discount(0, count) for count in self.trie.unigrams)
+
+        self.totals, self.gammas = [], []
+        num_nodes = len(self.trie.unigrams)
+        for index, level in enumerate(self.trie.levels):
+            totals = array('q', [0] * num_nodes)
+            gammas = array('d', [0.0] * num_nodes)
+            for parent, count in zip(self.trie.parents(index), level.counts):
+                totals[parent] += count
+                gammas[parent] += self._discount(index + 1, count)
+            self.totals.append(totals)
+            self.gammas.append(gammas)
+            num_nodes = len(level)
+        return self
+
+    def continuation_count(self, words):
+        """Number of distinct words preceding an N-gram of order lower
+        than N in the training set, or its raw count if the N-gram is
+        of the highest order, or starts with ``<s>``.
+
+        Arguments:
+            words (list):
+                Words of the N-gram.
+
+        Returns:
+            (int):
+                Count stored for the N-gram.
+        """
+        return self.trie.count([self.vocabulary.lookup(word) for word in words])
+
+    def _prob(self, context, word_id):
+        """Interpolated modified Kneser-Ney probability of a word id
+        following a context of word ids.
+        """
+        count = self.trie.unigrams[word_id] if word_id is not None else 0
+        prob = (max(count - self._discount(0, count), 0)
+                + self.unigram_gamma / (len(self.vocabulary) - 1)) / self.unigram_total
+
+        for j in range(len(context)):
+            position = self.trie.find(context[len(context) - 1 - j:])
+            if position is None:
+                break
+            total = self.totals[j][position]
+            if total == 0:
+                break
+
+            level = self.trie.levels[j]
+            child = None if word_id is None else level.index(position, word_id)
+            count = 0 if child is None else level.counts[child]
+            prob = (max(count - self._discount(j + 1, count), 0)
+                    + self.gammas[j][position] * prob) / total
+        return prob
+
+    def probability_mass(self, context):
+        """Sums the probabilities of every word in the vocabulary but
+        ``<s>`` following a context. Since ``<s>`` is never predicted,
+        the sum is 1, up to rounding, for any context.
+
+        Arguments:
+            context (list):
+                Tokens preceding the predicted word. Only the last N - 1
+                tokens are used.
+
+        Returns:
+            (float):
+                Total probability.
+        """
+        context = [self.vocabulary.lookup(token) for token in context]
+        context = context[len(context) - self.order + 1:]
+        bos = self.vocabulary.lookup(self.BOS)
+        return sum(self._prob(context, word_id)
+                   for word_id in range(len(self.vocabulary)) if word_id != bos)
+
+    def log_probability(self, sentence_tokens):
+        """Computes natural log of the probability of a sentence,
+        including the end symbol ``</s>``.
+
+        Arguments:
+            sentence_tokens (list):
+                List of tokens corresponding to a sentence.
+
+        Returns:
+            (float):
+                Log-probability of the sentence.
+        """
+        ids = self._pad([self.vocabulary.lookup(token) for token in sentence_tokens])
+        n = self.order
+        return sum(math.log(self._prob(ids[i - n + 1:i], ids[i]))
+                   for i in range(n - 1, len(ids)))
+
+    def transform(self, sentence_tokens, debug=False):
+        """N-gram probability computed for a sentence, represented
+        as a list of tokens.
+
+        Arguments:
+            sentence_tokens (list):
+                List of tokens corresponding to a sentence.
+
+        Returns:
+            prob (float):
+                N-gram probability with Kneser-Ney smoothing.
+        """
+        log_prob = self.log_probability(sentence_tokens)
+        if debug:
+            print(f"Sentence: {' '.join(sentence_tokens)}")
+            print(f'=> Log-probability of sentence = {log_prob}')
+            print(f'=> Total probability of words following sentence = '
+                  f'{self.probability_mass(sentence_tokens)}')
+        return math.exp(log_prob)
+
+    def evaluate(self, sentences):
+        """Scores a held-out set of sentences.
+
+        Arguments:
+            sentences (str or iterable):
+                Path or glob pattern of a file, from which sentences
+                are streamed. Otherwise, an iterable of sentences,
+                represented as a list of tokens.
+
+        Returns:
+            log_probs (list):
+                Log-probability of each sentence.
+            perplexity (float):
+                Corpus perplexity, i.e. exp of the negative mean
+                log-probability per predicted token, including ``</s>``.
+        """
+        if isinstance(sentences, str):
+            sentences = stream_sentences(sentences)
+
+        log_probs, num_tokens = [], 0
+        for tokens in sentences:
+            log_probs.append(self.log_probability(tokens))
+            num_tokens += len(tokens) + 1
+
+        if num_tokens == 0:
+            return log_probs, float('inf')
+        return log_probs, math.exp(-sum(log_probs) / num_tokens)
@@ -0,0 +1,94 @@
+"""
+Multiprocess map-reduce training for :class: ``ngram.Bigram``.
+
+Input files are split into shards by byte ranges, aligned to line
+boundaries: a line belongs to the shard in which its first byte lies.
+Each shard is counted into a local model in a worker process, and the
+local models are merged pairwise, level by level, in shard order. The
+resulting counts, and the vocabulary ids, are thus the same for every
+run with the same number of shards.
+"""
+
+
+import os
+from multiprocessing import Pool
+
+from ngram import Bigram
+from corpus import preprocess, expand_paths, count_unique_lines, shard_ranges, read_shard
+
+
+def _fit_shard(args):
+    shard, smoothing, k, preprocess_fn, dedup = args
+    model = Bigram(smoothing=smoothing, k=k)
+    if dedup:
+        lines = count_unique_lines(read_shard(*shard))
+        return model.partial_fit_weighted((preprocess_fn(line), weight)
+                                          for line, weight in lines.items())
+    return model.partial_fit(preprocess_fn(line) for line in read_shard(*shard))
+
+
+def _merge_pair(pair):
+    left, right = pair
+    return left.merge(right)
+
+
+def tree_reduce(pool, models):
+    """Merges models pairwise, level by level, preserving their order.
+
+    Arguments:
+        pool (multiprocessing.Pool):
+            Worker pool in which merges at each level are run.
+        models (list):
+            List of :class: ``ngram.Bigram`` models.
+
+    Returns:
+        (ngram.Bigram):
+            Merged model.
+    """
+    while len(models) > 1:
+        pairs = [(models[i], models[i + 1]) for i in range(0, len(models) - 1, 2)]
+        merged = pool.map(_merge_pair, pairs)
+        if len(models) % 2 == 1:
+            merged.append(models[-1])
+        models = merged
+    return models[0]
+
+
+def fit_parallel(paths, num_workers=None, smoothing=None, k=5,
+                 preprocess_fn=preprocess, dedup=False):
+    """Fits a bigram model on files with a pool of worker processes.
+
+    Arguments:
+        paths (str or list):
+            Path, glob pattern, or list of either.
+        num_workers (int or None):
+            Number of worker processes. If None, number of CPUs is used.
+        smoothing (str or None):
+            Smoothing technique, as in :class: ``ngram.Bigram``.
+        k (int):
+            Cutoff count for simple good turing discounting.
+        preprocess_fn (callable):
+            Maps a raw line to a list of tokens.
+        dedup (bool):
+            If True, repeated lines within each shard are preprocessed
+            and counted once, weighted by their multiplicity.
+
+    Returns:
+        model (ngram.Bigram):
+            Fitted bigram model.
+    """
+    num_workers = num_workers or os.cpu_count()
+
+    shards = []
+    for path in expand_paths(paths):
+        shards.extend(shard_ranges(path, num_workers))
+
+    with Pool(num_workers) as pool:
+        models = pool.map(_fit_shard, [(shard, smoothing, k, preprocess_fn, dedup)
+                                       for shard in shards])
+        if not models:
+            return Bigram(smoothing=smoothing, k=k)
+        model = tree_reduce(pool, models)
+
+    model._ensure_tables()
+    return model
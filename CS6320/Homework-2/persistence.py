@@ -0,0 +1,219 @@
+"""
+Compact binary model format, loadable with ``mmap``.
+
+A model file consists of a header, a table of sections and the data of
+each section, aligned to 8 bytes:
+
+    header:   magic (8 bytes), version (uint32), model kind (16 bytes),
+              number of sections (uint32)
+    table:    for each section, name (16 bytes), typecode (1 byte,
+              padded to 8), offset (int64), number of items (int64)
+    sections: raw little-endian arrays of ``array.array`` typecodes
+              'q' (int64), 'd' (float64) or 'B' (bytes)
+
+When loaded with ``use_mmap=True``, each section is a ``memoryview``
+over the mapped file. Pages are read from disk lazily, on first access,
+and processes mapping the same file share the same physical pages. On
+big-endian hosts, arrays are byte-swapped when written, and copied and
+byte-swapped when read, so files are portable, but are not shared.
+
+The format is used by the models of Homework-2 and Homework-3, which
+imports this module, see 'Homework-3/shared.py'.
+"""
+
+
+import sys
+import json
+import mmap
+import struct
+from array import array
+
+
+MAGIC = b'CS6320M\0'
+
+
+VERSION = 1
+
+
+HEADER = struct.Struct('<8sI16sI')
+
+
+SECTION = struct.Struct('<16sc7xqq')
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def write_sections(path, kind, sections):
+    """Writes named arrays to a model file.
+
+    Arguments:
+        path (str):
+            Path to model file.
+        kind (str):
+            Kind of model, checked when the file is loaded.
+        sections (dict):
+            Maps section names to ``array.array`` or ``bytes``.
+    """
+    table, blobs = [], []
+    offset = HEADER.size + SECTION.size * len(sections)
+    for name, values in sections.items():
+        if len(name.encode()) > 16:
+            raise ValueError(f'Section name {name} is longer than 16 bytes.')
+        if isinstance(values, (bytes, bytearray)):
+            typecode, blob, length = 'B', bytes(values), len(values)
+        else:
+            typecode, length = values.typecode, len(values)
+            if sys.byteorder != 'little':
+                values = array(typecode, values)
+                values.byteswap()
+            blob = values.tobytes()
+        offset = _align(offset)
+        table.append(SECTION.pack(name.encode(), typecode.encode(), offset, length))
+        blobs.append((offset, blob))
+        offset += len(blob)
+
+    with open(path, 'wb') as output_file:
+        output_file.write(HEADER.pack(MAGIC, VERSION, kind.encode(), len(sections)))
+        for entry in table:
+            output_file.write(entry)
+        for offset, blob in blobs:
+            output_file.write(b'\0' * (offset - output_file.tell()))
+            output_file.write(blob)
+
+
+def read_sections(path, kind, use_mmap=True):
+    """Reads named arrays from a model file.
+
+    Arguments:
+        path (str):
+            Path to model file.
+        kind (str):
+            Expected kind of model.
+        use_mmap (bool):
+            If True, sections are memoryviews over the memory-mapped
+            file. Otherwise, or on big-endian hosts, sections are
+            copied into ``array.array``.
+
+    Returns:
+        sections (dict):
+            Maps section names to arrays.
+
+    Raises:
+        ValueError:
+            If the file is not a model file of the expected kind and
+            version.
+    """
+    with open(path, 'rb') as input_file:
+        if use_mmap:
+            buffer = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = input_file.read()
+
+    magic, version, _kind, num_sections = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a model file.')
+    if version != VERSION:
+        raise ValueError(f'{path} has version {version}, expected {VERSION}.')
+    _kind = _kind.rstrip(b'\0').decode()
+    if _kind != kind:
+        raise ValueError(f'{path} holds a {_kind} model, expected {kind}.')
+
+    view = memoryview(buffer)
+    sections = {}
+    for i in range(num_sections):
+        name, typecode, offset, length = SECTION.unpack_from(
+            buffer, HEADER.size + SECTION.size * i)
+        typecode = typecode.decode()
+        size = length * array(typecode).itemsize
+        data = view[offset:offset + size].cast(typecode)
+        swap = sys.byteorder != 'little' and typecode != 'B'
+        if not use_mmap or swap:
+            data = array(typecode, data)
+        if swap:
+            data.byteswap()
+        sections[name.rstrip(b'\0').decode()] = data
+    return sections
+
+
+def write_meta(meta):
+    """Encodes model metadata as a JSON section.
+    """
+    return json.dumps(meta).encode()
+
+
+def read_meta(section):
+    """Decodes model metadata from a JSON section.
+    """
+    return json.loads(bytes(section).decode())
+
+
+def encode_strings(strings):
+    """Encodes strings as a table of UTF-8 bytes.
+
+    Returns:
+        (tuple):
+            Offsets (n + 1), concatenated UTF-8 bytes, and ids of the
+            strings in sorted order of their bytes.
+    """
+    encoded = [string.encode() for string in strings]
+    offsets = array('q', [0])
+    for blob in encoded:
+        offsets.append(offsets[-1] + len(blob))
+    order = array('q', sorted(range(len(encoded)), key=encoded.__getitem__))
+    return offsets, b''.join(encoded), order
+
+
+class StringTable:
+    """Read-only table of strings, interned to consecutive ids, stored
+    as UTF-8 bytes. Strings are looked up by binary search over their
+    ids in sorted order, so that no dictionary is built on load.
+
+    Parameters:
+        offsets (sequence):
+            Byte offset of each string in ``data``, and end of ``data``.
+        data (sequence):
+            Concatenated UTF-8 bytes.
+        order (sequence):
+            Ids of strings in sorted order of their bytes.
+    """
+    def __init__(self, offsets, data, order):
+        """Initializes :class: ``StringTable``.
+        """
+        self.offsets = offsets
+        self.data = data
+        self.order = order
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __contains__(self, string):
+        return self.lookup(string) is not None
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.word(index)
+
+    def _bytes(self, index):
+        return bytes(self.data[self.offsets[index]:self.offsets[index + 1]])
+
+    def word(self, index):
+        """Returns the string corresponding to an id.
+        """
+        return self._bytes(index).decode()
+
+    def lookup(self, string):
+        """Returns id of a string, or None if the string is not present.
+        """
+        target = string.encode()
+        low, high = 0, len(self.order)
+        while low < high:
+            mid = (low + high) // 2
+            if self._bytes(self.order[mid]) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self.order) and self._bytes(self.order[low]) == target:
+            return self.order[low]
+        return None
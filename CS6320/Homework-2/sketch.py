@@ -0,0 +1,123 @@
+"""
+Approximate frequency counting in a single pass with fixed memory.
+
+:class: ``CountMinSketch`` estimates the count of any item, never
+underestimating it, with a table of ``depth`` rows of ``width``
+counters. :class: ``HeavyHitters`` keeps a fixed number of candidate
+items with the largest estimated counts, in the manner of the
+Space-Saving algorithm: when a new item's estimate exceeds that of the
+smallest candidate, the smallest candidate is evicted.
+"""
+
+
+import heapq
+import zlib
+from array import array
+
+
+class CountMinSketch:
+    """Count-Min Sketch for estimating counts of items in a stream.
+
+    Parameters:
+        width (int):
+            Number of counters in each row.
+        depth (int):
+            Number of rows, each with an independent hash function.
+        table (array.array):
+            Counters, row by row.
+    """
+    def __init__(self, width=1 << 16, depth=4):
+        """Initializes :class: ``CountMinSketch``.
+
+        Arguments:
+            width (int):
+                Number of counters in each row.
+            depth (int):
+                Number of rows.
+        """
+        self.width = width
+        self.depth = depth
+        self.table = array('q', [0] * (width * depth))
+
+    def _positions(self, item):
+        data = repr(item).encode()
+        for row in range(self.depth):
+            yield row * self.width + zlib.crc32(data, row) % self.width
+
+    def add(self, item, count=1):
+        """Adds 'count' occurrences of 'item', and returns its estimate.
+        """
+        estimate = None
+        for position in self._positions(item):
+            self.table[position] += count
+            value = self.table[position]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, item):
+        """Estimated count of 'item', which is never below its true count.
+        """
+        return min(self.table[position] for position in self._positions(item))
+
+
+class HeavyHitters:
+    """Tracks the most frequent items in a stream with fixed memory.
+
+    Parameters:
+        sketch (sketch.CountMinSketch):
+            Estimates counts of all items.
+        capacity (int):
+            Maximum number of candidate items.
+        candidates (dict):
+            Maps each candidate item to its estimated count.
+    """
+    def __init__(self, capacity=1000, width=1 << 16, depth=4):
+        """Initializes :class: ``HeavyHitters``.
+
+        Arguments:
+            capacity (int):
+                Maximum number of candidate items.
+            width (int):
+                Number of counters in each row of the sketch.
+            depth (int):
+                Number of rows of the sketch.
+        """
+        self.sketch = CountMinSketch(width, depth)
+        self.capacity = capacity
+        self.candidates = {}
+        self._heap = []
+
+    def _min(self):
+        """Smallest estimate among candidates, after discarding heap
+        entries made stale by later updates.
+        """
+        while self.candidates.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0]
+
+    def add(self, item, count=1):
+        """Adds 'count' occurrences of 'item' to the stream.
+        """
+        estimate = self.sketch.add(item, count)
+        if item in self.candidates or len(self.candidates) < self.capacity:
+            self.candidates[item] = estimate
+            heapq.heappush(self._heap, (estimate, item))
+        elif estimate > self._min():
+            _, evicted = heapq.heappop(self._heap)
+            del self.candidates[evicted]
+            self.candidates[item] = estimate
+            heapq.heappush(self._heap, (estimate, item))
+
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(value, key) for key, value in self.candidates.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, k):
+        """Returns the k candidates with the largest estimated counts.
+
+        Returns:
+            (list):
+                List of (item, estimated count), in decreasing order of
+                estimated count.
+        """
+        return heapq.nlargest(k, self.candidates.items(), key=lambda item: item[1])
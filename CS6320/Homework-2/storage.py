@@ -0,0 +1,442 @@
+"""
+Compact count storage for N-gram models.
+
+Words are interned to integer ids by :class: ``Vocabulary``. Unigram
+counts live in an ``array('q')`` indexed by word id, and bigram counts
+in two parallel ``array('q')`` arrays: sorted keys, packing both word
+ids into a single 64-bit integer, and their counts. This costs 16 bytes
+per bigram, instead of more than 100 bytes for a dictionary entry keyed
+by a tuple of strings. The bigram model also keeps the rank of first
+occurrence of each bigram, for 8 more bytes, so that ties between
+counts are broken as in a dictionary, in order of first occurrence.
+
+:class: ``UnigramView`` and :class: ``BigramView`` expose the arrays
+as read-only dictionaries keyed by words and tuples of words.
+"""
+
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+
+SHIFT = 32
+
+
+MASK = (1 << SHIFT) - 1
+
+
+def pack(prev_id, next_id):
+    """Packs the word ids of a bigram into a single integer key.
+    Keys sort by previous word first, then by next word.
+    """
+    return (prev_id << SHIFT) | next_id
+
+
+def unpack(key):
+    """Unpacks an integer key into the word ids of a bigram.
+    """
+    return key >> SHIFT, key & MASK
+
+
+class Vocabulary:
+    """Interns words to consecutive integer ids.
+
+    Parameters:
+        word_to_id (dict):
+            Maps each word to its id.
+        id_to_word (list):
+            Word corresponding to each id.
+    """
+    def __init__(self, words=None):
+        """Initializes :class: ``Vocabulary``.
+
+        Arguments:
+            words (iterable or None):
+                Words to intern, in order of their ids.
+        """
+        self.word_to_id = {}
+        self.id_to_word = []
+        for word in words or []:
+            self.add(word)
+
+    def __len__(self):
+        return len(self.id_to_word)
+
+    def __contains__(self, word):
+        return word in self.word_to_id
+
+    def __iter__(self):
+        return iter(self.id_to_word)
+
+    def add(self, word):
+        """Interns a word.
+
+        Returns:
+            (int):
+                Id of the word.
+        """
+        word_id = self.word_to_id.get(word)
+        if word_id is None:
+            word_id = len(self.id_to_word)
+            self.word_to_id[word] = word_id
+            self.id_to_word.append(word)
+        return word_id
+
+    def encode(self, words):
+        """Interns a sequence of words.
+
+        Returns:
+            (list):
+                Id of each word.
+        """
+        return [self.add(word) for word in words]
+
+    def lookup(self, word):
+        """Returns id of a word, or None if the word is not interned.
+        """
+        return self.word_to_id.get(word)
+
+    def word(self, word_id):
+        """Returns the word corresponding to an id.
+        """
+        return self.id_to_word[word_id]
+
+
+class BigramCounts:
+    """Bigram counts stored as sorted packed keys, and their counts.
+
+    New counts are merged in batches with :func: ``update``, so that
+    the sorted arrays are rebuilt once per batch rather than once per
+    bigram.
+
+    Parameters:
+        keys (array.array):
+            Sorted packed keys of bigrams.
+        counts (array.array):
+            Count of the bigram at each position in ``keys``.
+        first (array.array or None):
+            Rank of the first occurrence of the bigram at each position
+            in ``keys``, among all bigrams, if tracked. Ranks break ties
+            between equal counts in order of first occurrence, as a
+            dictionary keyed by bigrams would.
+    """
+    def __init__(self, keys=None, counts=None, first=None):
+        """Initializes :class: ``BigramCounts``.
+
+        Arguments:
+            keys (array.array or None):
+                Sorted packed keys of bigrams.
+            counts (array.array or None):
+                Count of the bigram at each position in ``keys``.
+            first (array.array or None):
+                Rank of the first occurrence of each bigram. If None,
+                ranks are not tracked.
+        """
+        self.keys = keys if keys is not None else array('q')
+        self.counts = counts if counts is not None else array('q')
+        self.first = first
+
+    def __len__(self):
+        return len(self.keys)
+
+    def index(self, prev_id, next_id):
+        """Looks up the position of a bigram in ``keys`` by binary search.
+
+        Returns:
+            (int or None):
+                Position of the bigram, or None if it is not present.
+        """
+        key = pack(prev_id, next_id)
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return index
+        return None
+
+    def get(self, prev_id, next_id, default=0):
+        """Looks up the count of a bigram by binary search.
+
+        Arguments:
+            prev_id (int):
+                Id of the previous word.
+            next_id (int):
+                Id of the next word.
+            default (int):
+                Count returned if the bigram is not present.
+
+        Returns:
+            (int):
+                Count of the bigram.
+        """
+        index = self.index(prev_id, next_id)
+        if index is None:
+            return default
+        return self.counts[index]
+
+    def row(self, prev_id):
+        """Returns the range of positions in ``keys`` holding bigrams
+        which start with 'prev_id'.
+
+        Returns:
+            (tuple):
+                Start and end positions.
+        """
+        start = bisect_left(self.keys, pack(prev_id, 0))
+        end = bisect_left(self.keys, pack(prev_id + 1, 0), start)
+        return start, end
+
+    def update(self, staged):
+        """Merges a batch of counts into the sorted arrays.
+
+        Arguments:
+            staged (dict):
+                Maps packed keys to counts, in order of first occurrence
+                of the bigrams, if ranks are tracked.
+        """
+        if not staged:
+            return
+
+        if self.first is not None:
+            # New bigrams are ranked after those present, in order of
+            # first occurrence in the batch
+            rank = len(self.keys)
+            ranks = {}
+            for key in staged:
+                if self.index(*unpack(key)) is None:
+                    ranks[key] = rank
+                    rank += 1
+
+        staged = sorted(staged.items())
+        if not self.keys:
+            self.keys = array('q', [key for key, _ in staged])
+            self.counts = array('q', [count for _, count in staged])
+            if self.first is not None:
+                self.first = array('q', [ranks[key] for key, _ in staged])
+            return
+
+        keys, counts = array('q'), array('q')
+        old_keys, old_counts = self.keys, self.counts
+        i, j = 0, 0
+        while i < len(old_keys) and j < len(staged):
+            key, count = staged[j]
+            if old_keys[i] < key:
+                keys.append(old_keys[i])
+                counts.append(old_counts[i])
+                i += 1
+            elif old_keys[i] > key:
+                keys.append(key)
+                counts.append(count)
+                j += 1
+            else:
+                keys.append(key)
+                counts.append(old_counts[i] + count)
+                i += 1
+                j += 1
+
+        keys.extend(old_keys[i:])
+        counts.extend(old_counts[i:])
+        keys.extend(key for key, _ in staged[j:])
+        counts.extend(count for _, count in staged[j:])
+        if self.first is not None:
+            # Every old key is present in the merged keys, in the same order
+            first, i = array('q'), 0
+            for key in keys:
+                if i < len(old_keys) and old_keys[i] == key:
+                    first.append(self.first[i])
+                    i += 1
+                else:
+                    first.append(ranks[key])
+            self.first = first
+        self.keys, self.counts = keys, counts
+
+    def items(self):
+        """Yields (previous word id, next word id, count) for each bigram,
+        in sorted order of keys.
+        """
+        for key, count in zip(self.keys, self.counts):
+            prev_id, next_id = unpack(key)
+            yield prev_id, next_id, count
+
+
+def pack_ngram(ids):
+    """Packs the word ids of an N-gram into a single integer key, with
+    ``SHIFT`` bits per word. Keys of N-grams of the same order sort in
+    lexicographic order of their word ids.
+    """
+    key = 0
+    for word_id in ids:
+        key = (key << SHIFT) | word_id
+    return key
+
+
+class NGramTrie:
+    """Counts of N-grams of orders 1 to N, stored as a trie of sorted
+    arrays.
+
+    Each N-gram of order k > 1 is a node at level k - 1, keyed by the
+    position of its prefix (k-1)-gram at level k - 2, packed with the
+    id of its last word. Keys of each level are sorted, so that the
+    children of a node are contiguous, and found by binary search.
+
+    Parameters:
+        unigrams (array.array):
+            Count of each word, indexed by word id. Position of a
+            unigram at level 0 is its word id.
+        levels (list):
+            List of :class: ``BigramCounts``, where level k holds
+            N-grams of order k + 2.
+    """
+    def __init__(self, unigrams, levels):
+        """Initializes :class: ``NGramTrie``.
+
+        Arguments:
+            unigrams (array.array):
+                Count of each word, indexed by word id.
+            levels (list):
+                List of :class: ``BigramCounts`` for orders 2 to N.
+        """
+        self.unigrams = unigrams
+        self.levels = levels
+
+    @classmethod
+    def from_counts(cls, vocab_size, counts):
+        """Builds the trie from counts keyed by :func: ``pack_ngram``.
+
+        Every prefix of an N-gram present in ``counts`` must be present
+        in the counts of the lower order.
+
+        Arguments:
+            vocab_size (int):
+                Number of words in the vocabulary.
+            counts (list):
+                List of dictionaries, mapping packed keys of N-grams of
+                order k + 1 to their counts.
+
+        Returns:
+            (storage.NGramTrie):
+                Trie of sorted arrays.
+        """
+        unigrams = array('q', [0] * vocab_size)
+        for key, count in counts[0].items():
+            unigrams[key] = count
+
+        levels, parent_keys = [], None
+        for order_counts in counts[1:]:
+            keys = sorted(order_counts)
+            if parent_keys is None:
+                parents = [key >> SHIFT for key in keys]
+            else:
+                parents = [bisect_left(parent_keys, key >> SHIFT) for key in keys]
+            levels.append(BigramCounts(
+                array('q', [pack(parent, key & MASK) for parent, key in zip(parents, keys)]),
+                array('q', [order_counts[key] for key in keys])))
+            parent_keys = keys
+        return cls(unigrams, levels)
+
+    @property
+    def order(self):
+        return len(self.levels) + 1
+
+    def find(self, ids):
+        """Looks up the position of an N-gram at level ``len(ids) - 1``.
+
+        Arguments:
+            ids (list):
+                Word ids of the N-gram.
+
+        Returns:
+            (int or None):
+                Position of the N-gram, or None if it is not present.
+        """
+        position = ids[0]
+        if position is None or position >= len(self.unigrams):
+            return None
+        for level, word_id in zip(self.levels, ids[1:]):
+            if word_id is None:
+                return None
+            position = level.index(position, word_id)
+            if position is None:
+                return None
+        return position
+
+    def count(self, ids):
+        """Looks up the count of an N-gram.
+
+        Returns:
+            (int):
+                Count of the N-gram, 0 if it is not present.
+        """
+        position = self.find(ids)
+        if position is None:
+            return 0
+        if len(ids) == 1:
+            return self.unigrams[position]
+        return self.levels[len(ids) - 2].counts[position]
+
+    def parents(self, level):
+        """Yields the position of the parent of each node at a level,
+        i.e. of its prefix at the level below.
+        """
+        for key in self.levels[level].keys:
+            yield key >> SHIFT
+
+
+class UnigramView(Mapping):
+    """Read-only dictionary view of unigram counts, keyed by word.
+    """
+    def __init__(self, vocabulary, counts):
+        self.vocabulary = vocabulary
+        self.counts = counts
+
+    def __getitem__(self, word):
+        word_id = self.vocabulary.lookup(word)
+        if word_id is None:
+            raise KeyError(word)
+        return self.counts[word_id]
+
+    def __iter__(self):
+        return iter(self.vocabulary)
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def items(self):
+        return zip(self.vocabulary, self.counts)
+
+    def values(self):
+        return self.counts
+
+
+class BigramView(Mapping):
+    """Read-only dictionary view of bigram counts, keyed by a tuple
+    of words.
+    """
+    def __init__(self, vocabulary, counts):
+        self.vocabulary = vocabulary
+        self.counts = counts
+
+    def __getitem__(self, bigram):
+        prev_id = self.vocabulary.lookup(bigram[0])
+        next_id = self.vocabulary.lookup(bigram[1])
+        count = None
+        if prev_id is not None and next_id is not None:
+            count = self.counts.get(prev_id, next_id, None)
+        if count is None:
+            raise KeyError(bigram)
+        return count
+
+    def __iter__(self):
+        word = self.vocabulary.word
+        for prev_id, next_id, _ in self.counts.items():
+            yield word(prev_id), word(next_id)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def items(self):
+        word = self.vocabulary.word
+        for prev_id, next_id, count in self.counts.items():
+            yield (word(prev_id), word(next_id)), count
+
+    def values(self):
+        return self.counts.counts
@@ -0,0 +1,153 @@
+"""
+Least recently used (LRU) cache of decoded sentences, shared by
+:class: ``pos.POSTagger`` and the decoders of :mod: ``hmm``.
+
+Entries are keyed by a digest of the model version and the tokens of a
+sentence, so one cache can hold the results of several models, and the
+results of a model are never returned for another. The version of a
+model is a digest of its parameters, see :func: ``fingerprint``, so it
+is the same across processes, and a cache saved to disk stays valid
+for as long as the model does not change.
+"""
+
+
+import os
+import json
+from hashlib import blake2b
+from collections import OrderedDict
+
+import numpy as np
+
+
+def fingerprint(*parts):
+    """Digest of model parameters.
+
+    Arguments:
+        parts (tuple):
+            Arrays, matrices in compressed sparse row form, or any other
+            values with a deterministic ``repr``, such as lists of
+            strings or sorted lists of counts.
+
+    Returns:
+        (str):
+            Hexadecimal digest.
+    """
+    digest = blake2b(digest_size=16)
+    for part in parts:
+        if hasattr(part, 'indptr'):
+            arrays = [part.indptr, part.indices, part.data]
+        elif isinstance(part, np.ndarray) or (part and isinstance(part[0], list)):
+            arrays = [np.asarray(part, dtype=np.float64)]
+        else:
+            digest.update(repr(part).encode())
+            continue
+        for array in arrays:
+            digest.update(str(array.shape).encode())
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+class DecodeCache:
+    """LRU cache of decoded sentences.
+
+    Parameters:
+        capacity (int):
+            Maximum number of entries. The least recently used entry is
+            evicted once it is exceeded.
+        path (str or None):
+            Path to which the cache is saved by :func: ``save``, and from
+            which it is loaded, if present, on initialization.
+        entries (collections.OrderedDict):
+            Maps keys to decoded results, from least to most recently
+            used.
+        hits, misses, evictions (int):
+            Statistics since initialization.
+    """
+    def __init__(self, capacity=4096, path=None):
+        """Initializes :class: ``DecodeCache``.
+
+        Arguments:
+            capacity (int):
+                Maximum number of entries.
+            path (str or None):
+                Path to a cache saved with :func: ``save``.
+        """
+        self.capacity = capacity
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as input_file:
+                for key, value in json.load(input_file):
+                    self.entries[key] = tuple(value)
+            while len(self.entries) > capacity:
+                self.entries.popitem(last=False)
+
+
+    @staticmethod
+    def key(version, tokens, mode=None):
+        """Digest of a model version, a decoding mode, if any, and the
+        tokens of a sentence.
+        """
+        prefix = version if mode is None else f'{version}/{mode}'
+        digest = blake2b(prefix.encode(), digest_size=16)
+        for token in tokens:
+            digest.update(token.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+
+    def decode(self, model, tokens, decode_fn, mode=None):
+        """Returns the cached result of decoding a sentence with a model,
+        decoding it with 'decode_fn' on a miss.
+
+        Arguments:
+            model (object):
+                Model with a ``version`` attribute.
+            tokens (list):
+                List of tokens in a sentence.
+            decode_fn (callable):
+                Maps the tokens to a result, which must be a tuple of
+                JSON serializable values for the cache to be saved.
+            mode (str or None):
+                Name of the decoding mode, if a model decodes in several
+                modes, so that their results are cached separately.
+
+        Returns:
+            (tuple):
+                Result of decoding.
+        """
+        key = self.key(model.version, tokens, mode)
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+        self.misses += 1
+        value = tuple(decode_fn(tokens))
+        self.entries[key] = value
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+
+    @property
+    def stats(self):
+        """Hits, misses, evictions and number of entries.
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self.entries)}
+
+
+    def save(self, path=None):
+        """Saves the entries, in order of use, as JSON.
+
+        Arguments:
+            path (str or None):
+                Path to save the cache to. If None, ``path`` is used.
+        """
+        with open(path or self.path, 'w') as output_file:
+            json.dump(list(self.entries.items()), output_file)
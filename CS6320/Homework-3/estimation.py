@@ -0,0 +1,192 @@
+"""
+Estimation of Hidden Markov Model matrices from a fitted
+:class: ``pos.POSTagger``.
+
+The counts of the tagger are converted into index arrays once, and the
+matrices are filled by scattering those arrays, so no matrix is built
+element by element in Python. The matrices follow the layout expected
+by :class: ``hmm.Viterbi``:
+
+    delta:  (T + 1) x T, where row 0 holds P(tag | <s>) and row j + 1
+            holds P(tag | tag_j).
+    obs:    T x V, where entry (i, w) holds P(word_w | tag_i).
+
+Sparse matrices are stored in compressed sparse row (CSR) form, as
+:class: ``CSRMatrix``. The emission matrix is then stored transposed,
+one row per word, so that the tags of a word are contiguous.
+"""
+
+
+from collections import namedtuple
+
+import numpy as np
+
+from hmm import NumpyViterbi, SparseViterbi
+
+
+BOUNDARY_TAGS = ('<s>', '</s>')
+
+
+CSRMatrix = namedtuple('CSRMatrix', ['indptr', 'indices', 'data', 'shape'])
+
+
+def to_csr(rows, cols, values, shape):
+    """Builds a matrix in compressed sparse row form from coordinates
+    of its nonzero entries, which must be unique.
+
+    Arguments:
+        rows (numpy.ndarray):
+            Row index of each entry.
+        cols (numpy.ndarray):
+            Column index of each entry.
+        values (numpy.ndarray):
+            Value of each entry.
+        shape (tuple):
+            Number of rows and columns.
+
+    Returns:
+        (estimation.CSRMatrix):
+            Matrix with the column indices of each row in sorted order.
+    """
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+    return CSRMatrix(indptr, cols[order].astype(np.int64), values[order], shape)
+
+
+def _pair_arrays(counts, first_index, second_index):
+    """Converts counts keyed by pairs of strings into arrays of indices
+    and counts, skipping pairs whose strings are not indexed.
+    """
+    pairs = [(first_index[first], second_index[second], count)
+             for (first, second), count in counts.items()
+             if first in first_index and second in second_index]
+    table = np.array(pairs, dtype=np.int64).reshape(-1, 3)
+    return table[:, 0], table[:, 1], table[:, 2].astype(np.float64)
+
+
+class HMMMatrices:
+    """Transition and emission matrices of a Hidden Markov Model,
+    estimated from the counts of a parts of speech tagger.
+
+    Parameters:
+        vocabulary (list):
+            List of words, in order of their indices.
+        pos_tags (list):
+            List of POS tags, in order of their indices.
+        word_index (dict):
+            Maps each word to its index.
+        tag_index (dict):
+            Maps each POS tag to its index.
+        delta (numpy.ndarray or estimation.CSRMatrix):
+            State Transition matrix, (T + 1) x T.
+        obs (numpy.ndarray or estimation.CSRMatrix):
+            Observation Likelihood matrix, T x V if dense, and its
+            transpose, V x T, if sparse.
+        sparse (bool):
+            Whether matrices are stored in compressed sparse row form.
+    """
+    def __init__(self, vocabulary, pos_tags, delta, obs, sparse=False):
+        """Initializes :class: ``HMMMatrices``.
+
+        Arguments:
+            vocabulary (list):
+                List of words.
+            pos_tags (list):
+                List of POS tags.
+            delta (numpy.ndarray or estimation.CSRMatrix):
+                State Transition matrix.
+            obs (numpy.ndarray or estimation.CSRMatrix):
+                Observation Likelihood matrix.
+            sparse (bool):
+                Whether matrices are stored in compressed sparse row form.
+        """
+        self.vocabulary = vocabulary
+        self.pos_tags = pos_tags
+        self.word_index = {word: index for index, word in enumerate(vocabulary)}
+        self.tag_index = {tag: index for index, tag in enumerate(pos_tags)}
+        self.delta = delta
+        self.obs = obs
+        self.sparse = sparse
+
+
+    @classmethod
+    def from_tagger(cls, tagger, alpha=0.0, sparse=False):
+        """Estimates the matrices from the counts of a fitted tagger.
+
+        With ``alpha`` = 0, probabilities are the same relative
+        frequencies as used by :func: ``pos.POSTagger.transform``. With
+        ``alpha`` > 0, ``alpha`` is added to every count (Lidstone
+        smoothing; Laplacian smoothing for ``alpha`` = 1), so that no
+        transition or emission has probability 0.
+
+        Arguments:
+            tagger (pos.POSTagger):
+                Fitted parts of speech tagger.
+            alpha (float):
+                Constant added to every count.
+            sparse (bool):
+                If True, matrices are stored in compressed sparse row
+                form, see :class: ``CSRMatrix``.
+
+        Returns:
+            (estimation.HMMMatrices):
+                Estimated matrices.
+
+        Raises:
+            ValueError:
+                If sparse matrices are requested with smoothing, which
+                makes every entry nonzero.
+        """
+        if sparse and alpha > 0:
+            raise ValueError('Sparse matrices cannot be smoothed, as smoothing makes every entry nonzero.')
+
+        vocabulary = [word for word in tagger.vocabulary_tag_mapper if word not in BOUNDARY_TAGS]
+        pos_tags = [tag for tag in tagger.tag_unigrams if tag not in BOUNDARY_TAGS]
+        matrices = cls(vocabulary, pos_tags, None, None, sparse)
+        V, T = len(vocabulary), len(pos_tags)
+
+        tag_counts = np.array([tagger.tag_unigrams[tag] for tag in pos_tags], dtype=np.float64)
+        from_index = {'<s>': 0}
+        from_index.update((tag, index + 1) for index, tag in enumerate(pos_tags))
+        from_counts = np.concatenate([[tagger.tag_unigrams.get('<s>', 0)], tag_counts])
+
+        rows, cols, counts = _pair_arrays(tagger.tag_bigrams, from_index, matrices.tag_index)
+        denominators = from_counts + alpha * T
+        if sparse:
+            matrices.delta = to_csr(rows, cols, counts / denominators[rows], (T + 1, T))
+        else:
+            matrices.delta = np.zeros((T + 1, T))
+            np.divide(alpha, denominators[:, None], out=matrices.delta,
+                      where=denominators[:, None] > 0)
+            matrices.delta[rows, cols] = (counts + alpha) / denominators[rows]
+
+        words, tags, counts = _pair_arrays(tagger.word_tags, matrices.word_index, matrices.tag_index)
+        denominators = tag_counts + alpha * V
+        if sparse:
+            matrices.obs = to_csr(words, tags, counts / denominators[tags], (V, T))
+        else:
+            matrices.obs = np.zeros((T, V))
+            matrices.obs += alpha / denominators[:, None]
+            matrices.obs[tags, words] = (counts + alpha) / denominators[tags]
+        return matrices
+
+
+    def viterbi(self, decoder=NumpyViterbi, **kwargs):
+        """Returns a decoder over the matrices.
+
+        Arguments:
+            decoder (type):
+                :class: ``hmm.Viterbi``, :class: ``hmm.NumpyViterbi`` or
+                :class: ``hmm.SparseViterbi``.
+            kwargs (dict):
+                Further arguments of the decoder, e.g. ``beam``.
+
+        Raises:
+            ValueError:
+                If the matrices are sparse, and the decoder is not
+                :class: ``hmm.SparseViterbi``.
+        """
+        if self.sparse and decoder is not SparseViterbi:
+            raise ValueError(f'{decoder.__name__} requires dense matrices.')
+        return decoder(self.vocabulary, self.pos_tags, self.delta, self.obs, **kwargs)
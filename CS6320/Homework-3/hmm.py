@@ -17,9 +17,72 @@ Tested with the famous EISNER-ICECREAMS Hidden Markov Model example.
 
     LIKELIHOOD = [[0.2, 0.4, 0.4],
                   [0.5, 0.4, 0.1]]
+
+:class: ``NumpyViterbi`` decodes with the same model, with each step
+of the recursion computed as a single broadcast over NumPy arrays, and
+decodes batches of sentences at once, in log space. It also returns the
+k best sequences of tags, by lazy enumeration of the trellis, and the
+posterior marginal probability of each tag, by :func: ``forward_backward``.
+:class: ``StreamingViterbi`` decodes an unbounded stream of tokens with
+it, committing tags with bounded delay.
+
+:class: ``SparseViterbi`` only considers, at each step, the tags with
+nonzero probability of emitting the word, and the transitions with
+nonzero probability between them, optionally pruned by a beam.
 """
 
 
+import heapq
+from collections import deque
+
+import numpy as np
+
+from cache import fingerprint
+
+
+def forward_backward(start, transitions, emissions, indices):
+    """Scaled forward-backward algorithm for a single sentence.
+
+    Arguments:
+        start (numpy.ndarray):
+            Probability of each tag at the beginning of a sentence.
+        transitions (numpy.ndarray):
+            T x T matrix, where entry (j, i) is P(tag_i | tag_j).
+        emissions (numpy.ndarray):
+            V x T matrix, where entry (w, i) is P(word_w | tag_i).
+        indices (numpy.ndarray):
+            Word index of each token in the sentence.
+
+    Returns:
+        alpha (numpy.ndarray):
+            N x T scaled forward probabilities.
+        beta (numpy.ndarray):
+            N x T scaled backward probabilities.
+        scales (numpy.ndarray):
+            Scaling factor of each step. The probability of the sentence
+            is their product, and it is 0 if any of them is 0.
+    """
+    N, T = len(indices), len(start)
+    likelihoods = emissions[indices]
+    alpha, beta = np.empty((N, T)), np.empty((N, T))
+    scales = np.empty(N)
+
+    alpha[0] = start * likelihoods[0]
+    for t in range(N):
+        if t > 0:
+            alpha[t] = (alpha[t - 1] @ transitions) * likelihoods[t]
+        scales[t] = alpha[t].sum()
+        if scales[t] == 0:
+            scales[t:] = 0
+            return alpha, beta, scales
+        alpha[t] /= scales[t]
+
+    beta[-1] = 1
+    for t in range(N - 2, -1, -1):
+        beta[t] = transitions @ (likelihoods[t + 1] * beta[t + 1]) / scales[t + 1]
+    return alpha, beta, scales
+
+
 class Viterbi:
     """Viterbi algorithm in Hidden Markov Moels to decode 
     possible sequence of POS tags for a sentence.
@@ -33,6 +96,9 @@ class Viterbi:
             State Transition matrix.
         obs (list of lists):
             Observation Likelihood matrix.
+        cache (cache.DecodeCache or None):
+            If not None, decoded sentences are looked up in, and added
+            to, this cache.
     """
     def __init__(self, vocabulary, pos_tags, delta, obs):
         """Initializes :class: ``Viterbi``.
@@ -51,6 +117,18 @@ class Viterbi:
         self.pos_tags = pos_tags
         self.delta = delta
         self.obs = obs
+        self.cache = None
+        self._version = None
+
+
+    @property
+    def version(self):
+        """Digest of the parameters of the model, see
+        :func: ``cache.fingerprint``.
+        """
+        if self._version is None:
+            self._version = fingerprint(self.vocabulary, self.pos_tags, self.delta, self.obs)
+        return self._version
 
 
     def _initialize(self, first):
@@ -138,19 +216,24 @@ class Viterbi:
         return sequence
 
 
-    def transform(self, sentence):
+    def decode(self, tokens):
         """Given the HMM model, computes the most probable sequence
-        of POS tags for a sentence using the Viterbi algorithm.
+        of POS tags for a list of tokens using the Viterbi algorithm.
 
         Arguments:
-            sentence (str):
-                Input sentence for which POS tags need to be computed.
-        """
-        tokens = sentence.split(' ')
+            tokens (list):
+                List of tokens in a sentence.
 
+        Returns:
+            sequence (list or None):
+                List of POS tags corresponding to the tokens, or None if
+                any token is out-of-vocabulary.
+            prob (float):
+                Probability of the sequence.
+        """
         for token in tokens:
             if token not in self.vocabulary:
-                return 0
+                return None, 0.0
 
         start_probs = self._initialize(tokens[0])
         probs, backpointer = [], []
@@ -162,8 +245,699 @@ class Viterbi:
             backpointer.append(backpointer_t)
             probs_t_minus_1 = probs_t
 
-        sequence = self._decode_sequence(probs[-1], backpointer)
+        sequence = self._decode_sequence(probs_t_minus_1, backpointer)
+        return sequence, max(probs_t_minus_1)
+
+
+    def _decode_cached(self, tokens):
+        """Decodes a list of tokens with :func: ``decode``, through
+        ``cache`` if it is set.
+        """
+        if self.cache is None:
+            return self.decode(tokens)
+        return self.cache.decode(self, tokens, self.decode)
+
+
+    def transform(self, sentence):
+        """Given the HMM model, computes the most probable sequence
+        of POS tags for a sentence using the Viterbi algorithm.
+
+        Arguments:
+            sentence (str):
+                Input sentence for which POS tags need to be computed.
+        """
+        sequence, prob = self._decode_cached(sentence.split(' '))
+        if sequence is None:
+            return 0
 
         print(f'Sentence is: {sentence}')
         print(f'POS Tags are: {sequence}')
-        print(f'Probability = {max(probs[-1])}')
+        print(f'Probability = {prob}')
+
+
+class NumpyViterbi(Viterbi):
+    """Viterbi algorithm in Hidden Markov Models, vectorized with NumPy.
+
+    The matrices are converted to arrays once, and words are looked up
+    in a dictionary, so that each step of the recursion costs a single
+    broadcast of T x T operations, rather than a Python loop over them.
+
+    Parameters:
+        word_index (dict):
+            Maps each word in corpus to its index.
+        start (numpy.ndarray):
+            Probability of each POS tag at the beginning of a sentence.
+        transitions (numpy.ndarray):
+            T x T matrix, where entry (j, i) is P(tag_i | tag_j).
+        emissions (numpy.ndarray):
+            V x T matrix, where entry (w, i) is P(word_w | tag_i), i.e.
+            the transpose of the Observation Likelihood matrix, so that
+            the likelihoods of a word are contiguous.
+        log_start, log_transitions, log_emissions (numpy.ndarray):
+            Natural logarithms of the above, with log(0) = -inf.
+    """
+    def __init__(self, vocabulary, pos_tags, delta, obs):
+        """Initializes :class: ``NumpyViterbi``.
+
+        Arguments:
+            vocabulary (list):
+                List of words in corpus.
+            pos_tags (list):
+                List of POS tags in corpus.
+            delta (list of lists or numpy.ndarray):
+                State Transition matrix.
+            obs (list of lists or numpy.ndarray):
+                Observation Likelihood matrix.
+        """
+        super().__init__(vocabulary, pos_tags, delta, obs)
+        self.word_index = {word: index for index, word in enumerate(vocabulary)}
+
+        delta = np.asarray(delta, dtype=np.float64)
+        self.start = delta[0].copy()
+        self.transitions = delta[1:].copy()
+        self.emissions = np.ascontiguousarray(np.asarray(obs, dtype=np.float64).T)
+
+        with np.errstate(divide='ignore'):
+            self.log_start = np.log(self.start)
+            self.log_transitions = np.log(self.transitions)
+            self.log_emissions = np.log(self.emissions)
+
+
+    def encode(self, tokens):
+        """Maps tokens to word indices.
+
+        Returns:
+            (numpy.ndarray or None):
+                Index of each token, or None if any token is
+                out-of-vocabulary.
+        """
+        indices = np.empty(len(tokens), dtype=np.int64)
+        for t, token in enumerate(tokens):
+            index = self.word_index.get(token)
+            if index is None:
+                return None
+            indices[t] = index
+        return indices
+
+
+    def decode(self, tokens):
+        """Computes the most probable sequence of POS tags for a list of
+        tokens.
+
+        The factors of each step are multiplied in the same order as in
+        :class: ``Viterbi``, and ties are broken in favour of the first
+        tag, so both return the same result.
+
+        Arguments:
+            tokens (list):
+                List of tokens in a sentence.
+
+        Returns:
+            sequence (list or None):
+                List of POS tags corresponding to the tokens, or None if
+                any token is out-of-vocabulary.
+            prob (float):
+                Probability of the sequence.
+        """
+        indices = self.encode(tokens)
+        if indices is None or len(indices) == 0:
+            return None, 0.0
+
+        backpointer = np.empty((len(indices) - 1, len(self.pos_tags)), dtype=np.int64)
+        probs = self.start * self.emissions[indices[0]]
+        for t, index in enumerate(indices[1:]):
+            # P(tag_t-1) * (P(tag | tag_t-1) * P(word | tag))
+            joint_probs = probs[:, None] * (self.transitions * self.emissions[index])
+            backpointer[t] = joint_probs.argmax(axis=0)
+            probs = joint_probs[backpointer[t], np.arange(len(probs))]
+
+        tag_index = int(probs.argmax())
+        prob = float(probs[tag_index])
+        sequence = np.empty(len(indices), dtype=np.int64)
+        sequence[-1] = tag_index
+        for t in range(len(backpointer) - 1, -1, -1):
+            tag_index = backpointer[t, tag_index]
+            sequence[t] = tag_index
+        return [self.pos_tags[index] for index in sequence], prob
+
+
+    def decode_kbest(self, tokens, k):
+        """Computes the k most probable sequences of POS tags for a list
+        of tokens, in log space.
+
+        After a Viterbi pass, the j-th best path to each state of the
+        trellis is only computed when the (j + 1)-th best path through a
+        later state needs it, as in Algorithm 3 of Huang and Chiang
+        (2005), "Better k-best parsing". Each state keeps a heap of
+        candidates, one per previous tag, and a popped candidate is
+        replaced by the next best path through the same previous tag.
+        The cost beyond the Viterbi pass is thus O(N * k * log T) at
+        most, rather than enumerating tag sequences.
+
+        Arguments:
+            tokens (list):
+                List of tokens in a sentence.
+            k (int):
+                Number of sequences.
+
+        Returns:
+            sequences (numpy.ndarray or None):
+                Array of up to k rows of POS tags, in decreasing order of
+                probability, or None if any token is out-of-vocabulary.
+                Sequences with probability 0 are not returned.
+            log_probs (numpy.ndarray or None):
+                Log probability of each sequence.
+        """
+        indices = self.encode(tokens)
+        if indices is None or len(indices) == 0:
+            return None, None
+
+        N, T = len(indices), len(self.pos_tags)
+        best = np.empty((N, T))
+        best[0] = self.log_start + self.log_emissions[indices[0]]
+        for t in range(1, N):
+            best[t] = (best[t - 1][:, None] + self.log_transitions).max(axis=0) + \
+                      self.log_emissions[indices[t]]
+
+        # paths[t][i] lists (log prob, previous tag, rank of path through
+        # previous tag) of the best paths to tag i at step t found so far.
+        # expanded[t][i] counts the paths whose successor, i.e. the next
+        # best path through the same previous tag, is already a candidate.
+        paths = [{} for _ in range(N)]
+        candidates = [{} for _ in range(N)]
+        expanded = [{} for _ in range(N)]
+        exhausted = set()
+
+        def kth_path(t, i, r):
+            # Requests for paths are handled with an explicit stack rather
+            # than by recursion, as each step may need a path of the
+            # previous step, and sentences may be longer than the
+            # recursion limit.
+            requests = [(t, i, r)]
+            while requests:
+                s, tag, rank = requests[-1]
+                if tag not in paths[s]:
+                    if s == 0:
+                        paths[s][tag] = [(best[0, tag], None, 0)] if best[0, tag] > -np.inf else []
+                        candidates[s][tag] = []
+                        expanded[s][tag] = len(paths[s][tag])
+                    else:
+                        heap = [(-log_prob, j, 0) for j, log_prob in enumerate(
+                            best[s - 1] + self.log_transitions[:, tag] +
+                            self.log_emissions[indices[s], tag]) if log_prob > -np.inf]
+                        heapq.heapify(heap)
+                        paths[s][tag], candidates[s][tag], expanded[s][tag] = [], heap, 0
+
+                node_paths, heap = paths[s][tag], candidates[s][tag]
+                if len(node_paths) > rank:
+                    requests.pop()
+                    continue
+
+                if expanded[s][tag] < len(node_paths):
+                    _, j, previous_rank = node_paths[-1]
+                    previous = paths[s - 1].get(j, ())
+                    if len(previous) <= previous_rank + 1 and (s - 1, j) not in exhausted:
+                        requests.append((s - 1, j, previous_rank + 1))
+                        continue
+                    if len(previous) > previous_rank + 1:
+                        log_prob = previous[previous_rank + 1][0] + self.log_transitions[j, tag] + \
+                                   self.log_emissions[indices[s], tag]
+                        if log_prob > -np.inf:
+                            heapq.heappush(heap, (-log_prob, j, previous_rank + 1))
+                    expanded[s][tag] = len(node_paths)
+
+                if not heap:
+                    exhausted.add((s, tag))
+                    requests.pop()
+                    continue
+                log_prob, j, previous_rank = heapq.heappop(heap)
+                node_paths.append((-log_prob, j, previous_rank))
+
+            node_paths = paths[t][i]
+            return node_paths[r] if len(node_paths) > r else None
+
+        # Paths of the final step are merged in a heap over tags
+        heap = [(-best[-1, i], i, 0) for i in range(T) if best[-1, i] > -np.inf]
+        heapq.heapify(heap)
+        sequences, log_probs = [], []
+        while heap and len(sequences) < k:
+            log_prob, i, r = heapq.heappop(heap)
+            sequence = np.empty(N, dtype=np.int64)
+            tag, rank = i, r
+            for t in range(N - 1, -1, -1):
+                sequence[t] = tag
+                _, tag, rank = kth_path(t, tag, rank)
+            sequences.append(sequence)
+            log_probs.append(-log_prob)
+
+            path = kth_path(N - 1, i, r + 1)
+            if path is not None:
+                heapq.heappush(heap, (-path[0], i, r + 1))
+
+        tags = np.array(self.pos_tags)
+        return tags[np.array(sequences, dtype=np.int64).reshape(-1, N)], np.array(log_probs)
+
+
+    def decode_posterior(self, tokens):
+        """Computes the most probable POS tag of each token on its own,
+        i.e. the tag with the largest posterior marginal probability
+        given the whole sentence, by :func: ``forward_backward``.
+
+        Arguments:
+            tokens (list):
+                List of tokens in a sentence.
+
+        Returns:
+            sequence (numpy.ndarray or None):
+                POS tag of each token, or None if any token is
+                out-of-vocabulary, or the sentence has probability 0.
+            marginals (numpy.ndarray or None):
+                N x T posterior marginal probability of each tag at
+                each step.
+        """
+        indices = self.encode(tokens)
+        if indices is None or len(indices) == 0:
+            return None, None
+
+        alpha, beta, scales = forward_backward(self.start, self.transitions, self.emissions, indices)
+        if scales[-1] == 0:
+            return None, None
+
+        marginals = alpha * beta
+        return np.array(self.pos_tags)[marginals.argmax(axis=1)], marginals
+
+
+    def _decode_padded(self, indices, lengths):
+        """Max-plus recursion in log space over a padded batch of
+        sentences.
+
+        Arguments:
+            indices (numpy.ndarray):
+                B x N word indices, padded after the end of each
+                sentence.
+            lengths (numpy.ndarray):
+                Length of each sentence, at least 1.
+
+        Returns:
+            sequences (numpy.ndarray):
+                B x N tag indices, valid up to the length of each
+                sentence.
+            log_probs (numpy.ndarray):
+                Log probability of the sequence of each sentence.
+        """
+        B, N = indices.shape
+        T = len(self.pos_tags)
+        mask = np.arange(N)[None, :] < lengths[:, None]
+        identity = np.broadcast_to(np.arange(T), (B, T))
+        # Entry (i, j) is log P(tag_i | tag_j), so that the maximum over
+        # previous tags runs along contiguous memory.
+        log_transitions = np.ascontiguousarray(self.log_transitions.T)
+
+        backpointer = np.empty((N, B, T), dtype=np.int64)
+        backpointer[0] = identity
+        log_probs = self.log_start + self.log_emissions[indices[:, 0]]
+        for t in range(1, N):
+            # log P(tag_t-1) + log P(tag | tag_t-1), maximized over tag_t-1
+            joint_log_probs = log_probs[:, None, :] + log_transitions
+            backpointer[t] = joint_log_probs.argmax(axis=2)
+            log_probs_t = np.take_along_axis(joint_log_probs, backpointer[t][:, :, None], axis=2)[:, :, 0] + \
+                          self.log_emissions[indices[:, t]]
+
+            # Padded positions carry the scores of the last word forward
+            log_probs = np.where(mask[:, t, None], log_probs_t, log_probs)
+            backpointer[t] = np.where(mask[:, t, None], backpointer[t], identity)
+
+        sequences = np.empty((B, N), dtype=np.int64)
+        sequences[:, -1] = log_probs.argmax(axis=1)
+        best_log_probs = log_probs[np.arange(B), sequences[:, -1]]
+        for t in range(N - 1, 0, -1):
+            sequences[:, t - 1] = backpointer[t, np.arange(B), sequences[:, t]]
+        return sequences, best_log_probs
+
+
+    def decode_batch(self, sentences, batch_size=256):
+        """Computes the most probable sequence of POS tags for each of
+        many sentences, in log space, so that long sentences do not
+        underflow.
+
+        Sentences are sorted by length, and split into batches of
+        similar lengths, each of which is padded into a single array
+        and decoded at once. Padded positions are masked out.
+
+        Arguments:
+            sentences (list):
+                List of lists of tokens.
+            batch_size (int):
+                Maximum number of sentences decoded at once.
+
+        Returns:
+            sequences (list):
+                List of POS tags for each sentence, or None if the
+                sentence contains out-of-vocabulary words.
+            log_probs (numpy.ndarray):
+                Log probability of the sequence of each sentence, -inf
+                if it contains out-of-vocabulary words.
+        """
+        sequences = [None] * len(sentences)
+        log_probs = np.full(len(sentences), -np.inf)
+
+        encoded = {}
+        for i, tokens in enumerate(sentences):
+            if len(tokens) == 0:
+                sequences[i], log_probs[i] = [], 0.0
+                continue
+            indices = self.encode(tokens)
+            if indices is not None:
+                encoded[i] = indices
+
+        order = sorted(encoded, key=lambda i: len(encoded[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            lengths = np.array([len(encoded[i]) for i in batch], dtype=np.int64)
+            indices = np.zeros((len(batch), lengths.max()), dtype=np.int64)
+            for row, i in enumerate(batch):
+                indices[row, :lengths[row]] = encoded[i]
+
+            batch_sequences, batch_log_probs = self._decode_padded(indices, lengths)
+            for row, i in enumerate(batch):
+                sequences[i] = [self.pos_tags[index] for index in
+                                batch_sequences[row, :lengths[row]]]
+                log_probs[i] = batch_log_probs[row]
+        return sequences, log_probs
+
+
+def _compress(matrix):
+    """Compressed sparse row form of the nonzero entries of a dense
+    matrix, with their natural logarithms as values.
+
+    Returns:
+        (tuple):
+            Row offsets, column indices, and log values.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    rows, cols = np.nonzero(matrix)
+    indptr = np.zeros(matrix.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=matrix.shape[0]), out=indptr[1:])
+    return indptr, cols.astype(np.int64), np.log(matrix[rows, cols])
+
+
+class SparseViterbi(Viterbi):
+    """Viterbi algorithm in Hidden Markov Models over sparse matrices.
+
+    Emissions are stored column-wise, i.e. for each word, the tags with
+    nonzero probability of emitting it, and transitions in compressed
+    sparse row (CSR) form. At each step, only the tags of the current
+    word are scored, from the surviving tags of the previous word, over
+    the nonzero transitions between them. The cost of a step is thus
+    proportional to the number of those transitions, rather than T^2.
+
+    Parameters:
+        word_index (dict):
+            Maps each word in corpus to its index.
+        beam (float or None):
+            If not None, tags whose log probability is more than
+            ``beam`` below that of the best tag at a step are pruned.
+        transition_indptr, transition_indices, transition_log_probs (numpy.ndarray):
+            CSR form of the log State Transition matrix, where row 0
+            holds transitions from the start, and row j + 1 those from
+            tag j.
+        emission_indptr, emission_tags, emission_log_probs (numpy.ndarray):
+            CSR form of the log of the transposed Observation
+            Likelihood matrix, i.e. the tags of each word, in order.
+    """
+    def __init__(self, vocabulary, pos_tags, delta, obs, beam=None):
+        """Initializes :class: ``SparseViterbi``.
+
+        Arguments:
+            vocabulary (list):
+                List of words in corpus.
+            pos_tags (list):
+                List of POS tags in corpus.
+            delta (list of lists, numpy.ndarray or estimation.CSRMatrix):
+                State Transition matrix.
+            obs (list of lists, numpy.ndarray or estimation.CSRMatrix):
+                Observation Likelihood matrix, T x V if dense. If in CSR
+                form, it must be transposed, V x T, as built by
+                :func: ``estimation.HMMMatrices.from_tagger``.
+            beam (float or None):
+                Log probability below the best tag at which tags are
+                pruned. If None, decoding is exact.
+        """
+        super().__init__(vocabulary, pos_tags, delta, obs)
+        self.word_index = {word: index for index, word in enumerate(vocabulary)}
+        self.beam = beam
+
+        if hasattr(delta, 'indptr'):
+            with np.errstate(divide='ignore'):
+                self.transition_indptr, self.transition_indices, self.transition_log_probs = \
+                    delta.indptr, delta.indices, np.log(delta.data)
+        else:
+            self.transition_indptr, self.transition_indices, self.transition_log_probs = \
+                _compress(delta)
+
+        if hasattr(obs, 'indptr'):
+            with np.errstate(divide='ignore'):
+                self.emission_indptr, self.emission_tags, self.emission_log_probs = \
+                    obs.indptr, obs.indices, np.log(obs.data)
+        else:
+            self.emission_indptr, self.emission_tags, self.emission_log_probs = \
+                _compress(np.asarray(obs, dtype=np.float64).T)
+
+
+    def _transition(self, prev_rows, prev_log_probs, tags):
+        """Scores the tags of the current word from the surviving tags
+        of the previous word, over the nonzero transitions between them.
+
+        Arguments:
+            prev_rows (numpy.ndarray):
+                Rows of the transition matrix of the previous tags.
+            prev_log_probs (numpy.ndarray):
+                Log probability of the previous tags.
+            tags (numpy.ndarray):
+                Sorted tags of the current word.
+
+        Returns:
+            log_probs (numpy.ndarray):
+                Best log probability of reaching each tag, -inf if it
+                cannot be reached.
+            backpointer (numpy.ndarray):
+                Position of the best previous tag for each tag, -1 if it
+                cannot be reached.
+        """
+        starts = self.transition_indptr[prev_rows]
+        counts = self.transition_indptr[prev_rows + 1] - starts
+        sources = np.repeat(np.arange(len(prev_rows)), counts)
+        offsets = np.cumsum(counts) - counts
+        entries = np.arange(counts.sum()) - np.repeat(offsets - starts, counts)
+
+        positions = np.searchsorted(tags, self.transition_indices[entries])
+        valid = positions < len(tags)
+        valid[valid] = tags[positions[valid]] == self.transition_indices[entries[valid]]
+
+        # Dense k x m block of the nonzero transitions between the
+        # previous and current tags, where k and m are their numbers
+        joint_log_probs = np.full((len(prev_rows), len(tags)), -np.inf)
+        joint_log_probs[sources[valid], positions[valid]] = self.transition_log_probs[entries[valid]]
+        joint_log_probs += prev_log_probs[:, None]
+
+        backpointer = joint_log_probs.argmax(axis=0)
+        log_probs = joint_log_probs[backpointer, np.arange(len(tags))]
+        backpointer[log_probs == -np.inf] = -1
+        return log_probs, backpointer
+
+
+    def decode(self, tokens):
+        """Computes the most probable sequence of POS tags for a list of
+        tokens, in log space.
+
+        Arguments:
+            tokens (list):
+                List of tokens in a sentence.
+
+        Returns:
+            sequence (list or None):
+                List of POS tags corresponding to the tokens, or None if
+                any token is out-of-vocabulary, or if no sequence has
+                nonzero probability.
+            prob (float):
+                Probability of the sequence.
+        """
+        indices = [self.word_index.get(token) for token in tokens]
+        if not indices or None in indices:
+            return None, 0.0
+
+        prev_rows, prev_log_probs = np.zeros(1, dtype=np.int64), np.zeros(1)
+        history = []
+        for index in indices:
+            start, end = self.emission_indptr[index], self.emission_indptr[index + 1]
+            tags = self.emission_tags[start:end]
+            log_probs, backpointer = self._transition(prev_rows, prev_log_probs, tags)
+            log_probs += self.emission_log_probs[start:end]
+
+            survivors = backpointer >= 0
+            if self.beam is not None and survivors.any():
+                survivors &= log_probs >= log_probs[survivors].max() - self.beam
+            if not survivors.any():
+                return None, 0.0
+
+            tags, backpointer = tags[survivors], backpointer[survivors]
+            history.append((tags, backpointer))
+            prev_rows, prev_log_probs = tags + 1, log_probs[survivors]
+
+        position = int(prev_log_probs.argmax())
+        log_prob = float(prev_log_probs[position])
+        sequence_rev = []
+        for tags, backpointer in reversed(history):
+            sequence_rev.append(self.pos_tags[tags[position]])
+            position = backpointer[position]
+        return list(reversed(sequence_rev)), float(np.exp(log_prob))
+
+
+class StreamingViterbi:
+    """Online fixed-lag Viterbi decoding of an unbounded stream of
+    tokens, over the matrices of a :class: ``NumpyViterbi``.
+
+    The trellis is kept only for the tokens whose tags are not yet
+    committed. After each token, the best paths to all surviving tags
+    are traced back; once they converge at an earlier token, the tags
+    up to that token are the same whatever follows, and are committed.
+    If more than ``max_lag`` tokens are pending, the oldest are
+    committed along the best path so far. Memory is thus bounded by
+    ``max_lag`` steps of T backpointers.
+
+    A token which is out-of-vocabulary, or which no surviving tag can
+    emit, ends the current segment: pending tags are committed along
+    the best path, and decoding restarts from the start probabilities.
+    An out-of-vocabulary token is committed with tag None.
+
+    Parameters:
+        model (hmm.NumpyViterbi):
+            Hidden Markov Model.
+        max_lag (int or None):
+            Maximum number of pending tokens. If None, tags are only
+            committed once paths converge, or on :func: ``flush``.
+        log_probs (numpy.ndarray or None):
+            Log probability of the best path to each tag at the last
+            token, up to a constant, or None at the start of a segment.
+        window (collections.deque):
+            Pending tokens, and backpointers from each tag at a token to
+            the tag at the previous token.
+    """
+    def __init__(self, model, max_lag=50):
+        """Initializes :class: ``StreamingViterbi``.
+
+        Arguments:
+            model (hmm.NumpyViterbi):
+                Hidden Markov Model.
+            max_lag (int or None):
+                Maximum number of pending tokens.
+        """
+        self.model = model
+        self.max_lag = max_lag
+        self.log_probs = None
+        self.window = deque()
+
+
+    def _commit(self, count, tag):
+        """Commits the oldest 'count' pending tokens, along the path
+        which ends with 'tag' at the last of them.
+
+        Returns:
+            (list):
+                List of (token, POS tag) pairs.
+        """
+        tags = [tag]
+        for position in range(count - 1, 0, -1):
+            tag = self.window[position][1][tag]
+            tags.append(tag)
+
+        committed = []
+        for tag in reversed(tags):
+            token, _ = self.window.popleft()
+            committed.append((token, self.model.pos_tags[tag]))
+        return committed
+
+
+    def _converged(self):
+        """Finds the latest pending token at which the best paths to all
+        surviving tags converge.
+
+        Returns:
+            (tuple or None):
+                Number of pending tokens up to, and including, that
+                token, and the common tag there, or None.
+        """
+        tags = np.flatnonzero(self.log_probs > -np.inf)
+        for position in range(len(self.window) - 1, 0, -1):
+            if len(tags) == 1:
+                return position + 1, tags[0]
+            tags = np.unique(self.window[position][1][tags])
+        if len(tags) == 1:
+            return 1, tags[0]
+        return None
+
+
+    def push(self, token):
+        """Adds a token to the stream.
+
+        Arguments:
+            token (str):
+                Next token.
+
+        Returns:
+            committed (list):
+                List of (token, POS tag) pairs whose tags were committed
+                by this token, in order of the stream.
+        """
+        committed = []
+        index = self.model.word_index.get(token)
+        if index is None:
+            committed.extend(self.flush())
+            committed.append((token, None))
+            return committed
+
+        emissions = self.model.log_emissions[index]
+        if self.log_probs is not None:
+            joint_log_probs = self.log_probs[:, None] + self.model.log_transitions
+            backpointer = joint_log_probs.argmax(axis=0)
+            log_probs = joint_log_probs[backpointer, np.arange(len(backpointer))] + emissions
+            if log_probs.max() == -np.inf:
+                committed.extend(self.flush())
+
+        if self.log_probs is None:
+            backpointer = None
+            log_probs = self.model.log_start + emissions
+            if log_probs.max() == -np.inf:
+                committed.append((token, None))
+                return committed
+
+        # Paths are only compared with each other, so log probabilities
+        # are shifted to keep them from drifting towards -inf
+        self.log_probs = log_probs - log_probs.max()
+        self.window.append((token, backpointer))
+
+        convergence = self._converged()
+        if convergence is not None:
+            committed.extend(self._commit(*convergence))
+        if self.max_lag is not None and len(self.window) > self.max_lag:
+            count = len(self.window) - self.max_lag
+            tag = int(self.log_probs.argmax())
+            for position in range(len(self.window) - 1, count - 1, -1):
+                tag = self.window[position][1][tag]
+            committed.extend(self._commit(count, tag))
+        return committed
+
+
+    def flush(self):
+        """Commits all pending tokens along the best path, and restarts
+        decoding from the start probabilities.
+
+        Returns:
+            committed (list):
+                List of (token, POS tag) pairs of pending tokens.
+        """
+        committed = []
+        if self.window:
+            committed = self._commit(len(self.window), int(self.log_probs.argmax()))
+        self.log_probs = None
+        return committed
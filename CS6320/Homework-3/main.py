@@ -1,7 +1,15 @@
 import re
+import sys
 import argparse
+from functools import partial
 from pos import POSTagger
-from hmm import Viterbi
+from hmm import Viterbi, NumpyViterbi, SparseViterbi, StreamingViterbi
+from parallel import fit_parallel
+from estimation import HMMMatrices
+from training import BaumWelch
+from cache import DecodeCache
+from tagging import tag_file
+from shared import count_unique_lines
 
 
 TAGS = ['NNP', 'MD', 'VB', 'JJ', 'NN', 'RB', 'DT']
@@ -52,6 +60,39 @@ def preprocess(sentence, transform):
     return tokens
 
 
+def fit_tagger(args):
+    """Loads, or fits on 'train.txt', a parts of speech tagger as
+    specified by command line arguments.
+
+    Returns:
+        tagger (pos.POSTagger):
+            Fitted parts of speech tagger.
+    """
+    if args.load_model:
+        return POSTagger.load(args.load_model)
+
+    if args.workers > 1:
+        return fit_parallel('train.txt', partial(preprocess, transform=False),
+                            num_workers=args.workers, dedup=args.dedup)
+
+    if args.dedup:
+        with open('train.txt', 'r') as input_file:
+            lines = count_unique_lines(input_file)
+
+        tagger = POSTagger()
+        return tagger.fit_weighted((preprocess(line, transform=False), weight)
+                                   for line, weight in lines.items())
+
+    with open('train.txt', 'r') as input_file:
+        sentences = input_file.readlines()
+
+    sentences = [preprocess(sentence, transform=False) for sentence in sentences]
+
+    tagger = POSTagger()
+
+    return tagger.fit(sentences)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='CS6320: Homework 3')
     parser.add_argument('--run', dest='run', type=str,
@@ -62,24 +103,167 @@ if __name__ == '__main__':
     parser.add_argument('--debug', dest='debug', action='store_true',
                         help='To debug output of :func: `transform` in POSTagger,\
                         pass this flag.')
+    parser.add_argument('--exhaustive', dest='exhaustive', action='store_true',
+                        help='If passed, the POSTagger scores every combination of \
+                        tags instead of decoding them by dynamic programming.')
+    parser.add_argument('--workers', dest='workers', type=int, default=1,
+                        help='Number of worker processes for training the POSTagger, \
+                        the E-step of the Baum-Welch algorithm, and tagging with \
+                        \'--input-file\'. If greater than 1, \'train.txt\' is sharded \
+                        by byte ranges and counted in parallel.')
+    parser.add_argument('--dedup', dest='dedup', action='store_true',
+                        help='If passed, repeated sentences in \'train.txt\' are \
+                        preprocessed and counted once by the POSTagger, weighted by \
+                        their multiplicity.')
+    parser.add_argument('--save-model', dest='save_model', type=str,
+                        help='Path to save the fitted POSTagger to, in a compact \
+                        binary format.')
+    parser.add_argument('--load-model', dest='load_model', type=str,
+                        help='Path to a POSTagger saved with \'--save-model\'. If \
+                        passed, the tagger is memory-mapped instead of being fit.')
+    parser.add_argument('--estimate', dest='estimate', action='store_true',
+                        help='If passed, the Hidden Markov Model is estimated from the \
+                        counts of a POSTagger fit on \'train.txt\', instead of using \
+                        the example matrices.')
+    parser.add_argument('--alpha', dest='alpha', type=float, default=0.0,
+                        help='Constant added to every transition and emission count \
+                        when estimating the Hidden Markov Model.')
+    parser.add_argument('--backend', dest='backend', type=str, default='numpy',
+                        choices=['python', 'numpy', 'sparse'],
+                        help='Implementation of the Viterbi algorithm for the Hidden \
+                        Markov Model, choices are: (a) python, (b) numpy, (c) sparse.')
+    parser.add_argument('--beam', dest='beam', type=float, default=None,
+                        help='With the sparse backend, tags whose log probability is \
+                        more than \'beam\' below that of the best tag are pruned.')
+    parser.add_argument('--baum-welch', dest='baum_welch', type=str,
+                        help='Path to unlabeled text, with one sentence of space \
+                        separated words per line. If passed, the Hidden Markov Model is \
+                        re-estimated on it with the Baum-Welch algorithm.')
+    parser.add_argument('--iterations', dest='iterations', type=int, default=20,
+                        help='Maximum number of iterations of the Baum-Welch algorithm.')
+    parser.add_argument('--checkpoint', dest='checkpoint', type=str,
+                        help='Path to which the matrices are saved after each iteration \
+                        of the Baum-Welch algorithm.')
+    parser.add_argument('--k-best', dest='k_best', type=int,
+                        help='If passed, the k most probable sequences of tags are \
+                        printed by the Hidden Markov Model, with the numpy backend.')
+    parser.add_argument('--posterior', dest='posterior', action='store_true',
+                        help='If passed, the tag of each word with the largest posterior \
+                        marginal probability is printed by the Hidden Markov Model, with \
+                        the numpy backend.')
+    parser.add_argument('--stream', dest='stream', action='store_true',
+                        help='If passed, tokens are read from standard input until it \
+                        ends, and each WORD_TAG is printed once its tag is committed, \
+                        with the numpy backend.')
+    parser.add_argument('--max-lag', dest='max_lag', type=int, default=50,
+                        help='With \'--stream\', maximum number of tokens whose tags are \
+                        pending.')
+    parser.add_argument('--cache', dest='cache', type=str,
+                        help='Path to a cache of decoded sentences, shared by the \
+                        POSTagger and the Hidden Markov Model. It is loaded if present, \
+                        and saved after decoding. Can not be used with \'--input-file\'.')
+    parser.add_argument('--cache-size', dest='cache_size', type=int, default=4096,
+                        help='Maximum number of sentences in the cache.')
+    parser.add_argument('--input-file', dest='input_file', type=str,
+                        help='Path to a file of sentences to tag, one per line, or - \
+                        for standard input. If passed, sentences are tagged in batch \
+                        instead of being read interactively.')
+    parser.add_argument('--output-file', dest='output_file', type=str, default='-',
+                        help='Path to write tagged sentences to, as WORD_TAG tokens, \
+                        or - for standard output.')
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=1000,
+                        help='Number of sentences sent to a worker process at a time \
+                        with \'--input-file\'.')
     args = parser.parse_args()
 
+    if args.run == 'hmm' and (args.k_best or args.posterior or args.stream) \
+            and args.backend != 'numpy':
+        parser.error('--k-best, --posterior and --stream require --backend numpy.')
+    if args.cache and args.input_file:
+        parser.error('--cache cannot be used with --input-file, as each worker process decodes '
+                     'its own sentences.')
+
+    cache = DecodeCache(args.cache_size, args.cache) if args.cache else None
+    summary = None
+
 
     if args.run == 'pos':
-        with open('train.txt', 'r') as input_file:
-            sentences = input_file.readlines()
+        tagger = fit_tagger(args)
 
-        sentences = [preprocess(sentence, transform=False) for sentence in sentences]
-        
-        tagger = POSTagger()
+        if args.save_model:
+            tagger.save(args.save_model)
 
-        tagger.fit(sentences)
-#       sentence = 'Brainpower has the seal .'
-        sentence = input('Enter sentence to compute POS tags: ')
-        tagger.transform(preprocess(sentence, transform=True),
-                         debug=args.debug)
+        if args.input_file:
+            if args.load_model:
+                summary = tag_file(args.load_model, args.input_file, args.output_file,
+                                   args.workers, args.chunk_size, load_fn=POSTagger.load)
+            else:
+                summary = tag_file(tagger, args.input_file, args.output_file,
+                                   args.workers, args.chunk_size)
+        else:
+#           sentence = 'Brainpower has the seal .'
+            sentence = input('Enter sentence to compute POS tags: ')
+            tagger.cache = cache
+            tagger.transform(preprocess(sentence, transform=True),
+                             debug=args.debug, exhaustive=args.exhaustive)
 
     elif args.run == 'hmm':
-        model = Viterbi(WORDS, TAGS, DELTA, LIKELIHOOD)
-        sentence = input('Enter sentence to compute POS tags: ')
-        model.transform(sentence)
\ No newline at end of file
+        decoder = {'python': Viterbi, 'numpy': NumpyViterbi, 'sparse': SparseViterbi}[args.backend]
+        kwargs = {'beam': args.beam} if args.backend == 'sparse' else {}
+        if args.estimate:
+            sparse = args.backend == 'sparse' and args.alpha == 0 and not args.baum_welch
+            model = HMMMatrices.from_tagger(fit_tagger(args), alpha=args.alpha,
+                                            sparse=sparse).viterbi(decoder, **kwargs)
+        else:
+            model = decoder(WORDS, TAGS, DELTA, LIKELIHOOD, **kwargs)
+
+        if args.baum_welch:
+            with open(args.baum_welch, 'r') as input_file:
+                sentences = [line.split() for line in input_file]
+
+            trainer = BaumWelch(model.vocabulary, model.pos_tags, model.delta, model.obs,
+                                num_workers=args.workers, max_iter=args.iterations,
+                                checkpoint=args.checkpoint).fit(sentences)
+            print(f'Log likelihood per iteration: {trainer.log_likelihoods}')
+            model = trainer.viterbi(decoder, **kwargs)
+
+        if args.input_file:
+            summary = tag_file(model, args.input_file, args.output_file,
+                               args.workers, args.chunk_size)
+
+        elif args.stream:
+            decoder = StreamingViterbi(model, max_lag=args.max_lag)
+            for line in sys.stdin:
+                for token in line.split():
+                    for word, tag in decoder.push(token):
+                        print(f'{word}_{tag}', flush=True)
+            for word, tag in decoder.flush():
+                print(f'{word}_{tag}', flush=True)
+
+        else:
+            sentence = input('Enter sentence to compute POS tags: ')
+            if args.k_best:
+                sequences, log_probs = model.decode_kbest(sentence.split(' '), args.k_best)
+                if sequences is not None:
+                    print(f'Sentence is: {sentence}')
+                    for rank, (sequence, log_prob) in enumerate(zip(sequences, log_probs), 1):
+                        print(f'{rank}. POS Tags are: {sequence.tolist()}, Log probability = {log_prob}')
+            elif args.posterior:
+                sequence, marginals = model.decode_posterior(sentence.split(' '))
+                if sequence is not None:
+                    print(f'Sentence is: {sentence}')
+                    print(f'POS Tags are: {sequence.tolist()}')
+                    print(f'Posterior probabilities = {marginals.max(axis=1).tolist()}')
+            else:
+                model.cache = cache
+                model.transform(sentence)
+
+    if summary is not None:
+        print(f"Tagged {summary['sentences']} sentences ({summary['tokens']} tokens) in "
+              f"{summary['seconds']:.2f} s: {summary['sentences'] / max(summary['seconds'], 1e-9):.1f} "
+              f"sentences/s, {summary['tokens'] / max(summary['seconds'], 1e-9):.1f} tokens/s",
+              file=sys.stderr)
+
+    if cache is not None:
+        cache.save()
+        print(f'Cache: {cache.stats}')
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Multiprocess map-reduce training for :class: ``pos.POSTagger``.
+
+The tagged corpus is split into shards by byte ranges, aligned to line
+boundaries: a line belongs to the shard in which its first byte lies.
+Each shard is counted into a local tagger in a worker process, and the
+local taggers are merged pairwise, level by level, in shard order. The
+resulting counts, and the order of tags for each word, are thus the
+same for every run with the same number of shards. Sharding is shared
+with Homework-2, see :func: ``corpus.shard_ranges``.
+"""
+
+
+import os
+from multiprocessing import Pool
+
+from pos import POSTagger
+from shared import count_unique_lines, shard_ranges, read_shard
+
+
+def _fit_shard(args):
+    shard, preprocess_fn, dedup = args
+    if dedup:
+        lines = count_unique_lines(read_shard(*shard))
+        return POSTagger().fit_weighted((preprocess_fn(line), weight)
+                                        for line, weight in lines.items())
+    sentences = [preprocess_fn(line) for line in read_shard(*shard)]
+    return POSTagger().fit(sentences)
+
+
+def _merge_pair(pair):
+    left, right = pair
+    return left.merge(right)
+
+
+def fit_parallel(path, preprocess_fn, num_workers=None, dedup=False):
+    """Fits a parts of speech tagger on a tagged corpus with a pool of
+    worker processes.
+
+    Arguments:
+        path (str):
+            Path to tagged corpus, with one sentence per line.
+        preprocess_fn (callable):
+            Maps a raw line to a list of WORD_TAG tokens.
+        num_workers (int or None):
+            Number of worker processes. If None, number of CPUs is used.
+        dedup (bool):
+            If True, repeated lines within each shard are preprocessed
+            and counted once, weighted by their multiplicity.
+
+    Returns:
+        tagger (pos.POSTagger):
+            Fitted parts of speech tagger.
+    """
+    num_workers = num_workers or os.cpu_count()
+    shards = shard_ranges(path, num_workers)
+
+    with Pool(num_workers) as pool:
+        taggers = pool.map(_fit_shard, [(shard, preprocess_fn, dedup)
+                                        for shard in shards])
+        if not taggers:
+            return POSTagger()
+
+        while len(taggers) > 1:
+            pairs = [(taggers[i], taggers[i + 1]) for i in range(0, len(taggers) - 1, 2)]
+            merged = pool.map(_merge_pair, pairs)
+            if len(taggers) % 2 == 1:
+                merged.append(taggers[-1])
+            taggers = merged
+    return taggers[0]
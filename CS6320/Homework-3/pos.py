@@ -6,52 +6,205 @@ is not present in the vocabulary, then no tag-sequence is returned.
 """
 
 
+from array import array
 from itertools import product
-from collections import Counter
+from collections.abc import Mapping
+
+from cache import fingerprint
+from shared import Vocabulary, BigramCounts, SHIFT, pack, unpack, write_sections, \
+                   read_sections, write_meta, read_meta, encode_strings, StringTable
+
+
+class _PairCounts(Mapping):
+    """Read-only dictionary view of counts keyed by a pair of strings,
+    stored as :class: ``storage.BigramCounts`` keyed by packed ids.
+    """
+    def __init__(self, first, second, pairs):
+        self.first, self.second, self.pairs = first, second, pairs
+
+    def __getitem__(self, pair):
+        count = self.get(pair)
+        if count is None:
+            raise KeyError(pair)
+        return count
+
+    def get(self, pair, default=None):
+        first_id, second_id = self.first.lookup(pair[0]), self.second.lookup(pair[1])
+        if first_id is None or second_id is None:
+            return default
+        return self.pairs.get(first_id, second_id, default)
+
+    def __iter__(self):
+        for key in self.pairs.keys:
+            first_id, second_id = unpack(key)
+            yield self.first.word(first_id), self.second.word(second_id)
+
+    def __len__(self):
+        return len(self.pairs)
+
+
+class _Counts(Mapping):
+    """Read-only dictionary view of counts keyed by a string, stored as
+    an array indexed by the id of the string.
+    """
+    def __init__(self, table, counts):
+        self.table, self.counts = table, counts
+
+    def __getitem__(self, string):
+        index = self.table.lookup(string)
+        if index is None:
+            raise KeyError(string)
+        return self.counts[index]
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def __len__(self):
+        return len(self.table)
+
+
+class _TagMapper(Mapping):
+    """Read-only dictionary view mapping each word to the POS tags it
+    was used as, stored as a flat array of tag ids with offsets.
+    """
+    def __init__(self, words, tags, offsets, tag_ids):
+        self.words, self.tags = words, tags
+        self.offsets, self.tag_ids = offsets, tag_ids
+
+    def __getitem__(self, word):
+        index = self.words.lookup(word)
+        if index is None:
+            raise KeyError(word)
+        return [self.tags.word(tag_id) for tag_id in
+                self.tag_ids[self.offsets[index]:self.offsets[index + 1]]]
+
+    def __contains__(self, word):
+        return self.words.lookup(word) is not None
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
 
 
 class POSTagger:
     """Parts of Speech Tagger using a Bigram Model without smoothing.
 
+    Counts are kept by word and tag ids, in arrays, and exposed keyed
+    by strings through read-only dictionary views, which translate
+    strings to ids on each lookup.
+
     Parameters:
-        word_tags (dict):
+        words (storage.Vocabulary or persistence.StringTable):
+            Words of the corpus, in order of first occurrence.
+        tags (storage.Vocabulary or persistence.StringTable):
+            POS tags of the corpus, in order of first occurrence.
+        word_tag_counts (storage.BigramCounts):
+            Count of each combination of a word id and a tag id.
+        tag_counts (array.array):
+            Count of each tag id.
+        tag_bigram_counts (storage.BigramCounts):
+            Count of each combination of two tag ids.
+        mapper_offsets (array.array):
+            Start of the tag ids of each word id in ``mapper_tags``,
+            followed by the length of ``mapper_tags``.
+        mapper_tags (array.array):
+            Ids of the POS tags each word was used as, in order of
+            first occurrence, for each word id in turn.
+        word_tags (Mapping):
             Maps a combination of a word and its POS tag to their
             respective count in the corpus.
-        tag_unigrams (dict):
+        tag_unigrams (Mapping):
             Maps each POS tag in the corpus with its resective count.
-        tag_bigrams (dict):
+        tag_bigrams (Mapping):
             Maps each combination of two POS tags in the corpus with
             its resective count.
-        vocabulary_tag_mapper (None or dict):
+        vocabulary_tag_mapper (Mapping):
             Maps each word in the corpus with all the POS tags it was
             used as.
+        cache (cache.DecodeCache or None):
+            If not None, decoded sentences are looked up in, and added
+            to, this cache.
     """
     def __init__(self):
         """Initializes :class: ``POSTagger``.
         """
-        self.word_tags = {}
-        self.tag_unigrams = {}
-        self.tag_bigrams = {}
+        self.words = Vocabulary()
+        self.tags = Vocabulary()
+        self.word_tag_counts = BigramCounts()
+        self.tag_counts = array('q')
+        self.tag_bigram_counts = BigramCounts()
+        self.mapper_offsets = array('q', [0])
+        self.mapper_tags = array('q')
+        self.cache = None
+        self._version = None
+        self._set_views()
+
+
+    def _set_views(self):
+        """Sets the views of the counts keyed by strings.
+        """
+        self.word_tags = _PairCounts(self.words, self.tags, self.word_tag_counts)
+        self.tag_unigrams = _Counts(self.tags, self.tag_counts)
+        self.tag_bigrams = _PairCounts(self.tags, self.tags, self.tag_bigram_counts)
+        self.vocabulary_tag_mapper = _TagMapper(self.words, self.tags, self.mapper_offsets,
+                                                self.mapper_tags)
+        self._tag_rows = {}
+        self._transitions = None
 
 
-    def _map_words_to_tags(self, sentence_tokens):
-        """
-        """
-        vocabulary_tag_mapper = {}
+    def _tag_row(self, word):
+        """Ids and names of the POS tags of a word, in order of first
+        occurrence, and the probability of the word given each of them.
+        Computed from the arrays of counts when the word is first
+        decoded after the tagger is fit, merged or loaded.
 
-        for sent in sentence_tokens:
-            for each in sent:
-                word, tag = each.split('_')
-                if word in vocabulary_tag_mapper:
-                    if tag not in vocabulary_tag_mapper[word]:
-                        vocabulary_tag_mapper[word].add(tag)
-                else:
-                    vocabulary_tag_mapper[word] = set([tag])
+        Arguments:
+            word (str):
+                In-vocabulary word.
 
-        for word in vocabulary_tag_mapper:
-            tags = list(vocabulary_tag_mapper[word])
-            vocabulary_tag_mapper[word] = tags
-        return vocabulary_tag_mapper
+        Returns:
+            (tuple):
+                Lists of tag ids, tags and emission probabilities.
+        """
+        row = self._tag_rows.get(word)
+        if row is None:
+            word_id = self.words.lookup(word)
+            tag_ids = self.mapper_tags[self.mapper_offsets[word_id]:self.mapper_offsets[word_id + 1]]
+            row = self._tag_rows[word] = (
+                list(tag_ids), [self.tags.word(tag_id) for tag_id in tag_ids],
+                [self.word_tag_counts.get(word_id, tag_id) / self.tag_counts[tag_id]
+                 for tag_id in tag_ids])
+        return row
+
+
+    @property
+    def transitions(self):
+        """Probability of each POS tag id following another, as a list
+        of rows indexed by the id of the previous tag. Built from the
+        arrays of counts when first used after the tagger is fit,
+        merged or loaded, since the number of tags is small.
+        """
+        if self._transitions is None:
+            transitions = [[0.0] * len(self.tags) for _ in range(len(self.tags))]
+            for first_id, second_id, count in self.tag_bigram_counts.items():
+                transitions[first_id][second_id] = count / self.tag_counts[first_id]
+            self._transitions = transitions
+        return self._transitions
+
+
+    @property
+    def version(self):
+        """Digest of the counts of the tagger, see
+        :func: ``cache.fingerprint``. It is recomputed after the tagger
+        is fit or merged.
+        """
+        if self._version is None:
+            self._version = fingerprint(sorted(self.word_tags.items()),
+                                        sorted(self.tag_unigrams.items()),
+                                        sorted(self.tag_bigrams.items()))
+        return self._version
 
 
     def _get_tag_combinations(self, words):
@@ -72,6 +225,49 @@ class POSTagger:
         return tag_combs
                 
 
+    def _add_counts(self, words, tags, word_tag_counts, tag_counts, tag_bigram_counts):
+        """Adds counts keyed by word and tag ids to the counts of the
+        tagger, and appends new POS tags of each word to its tags, in
+        order of first occurrence.
+
+        Arguments:
+            words (storage.Vocabulary):
+                Words of the tagger, followed by new words.
+            tags (storage.Vocabulary):
+                POS tags of the tagger, followed by new tags.
+            word_tag_counts (dict):
+                Maps packed word and tag ids to counts, in order of
+                first occurrence.
+            tag_counts (array.array):
+                Count of each tag id in 'tags'.
+            tag_bigram_counts (dict):
+                Maps packed ids of two POS tags to counts.
+        """
+        offsets = self.mapper_offsets
+        mapper = [list(self.mapper_tags[offsets[index]:offsets[index + 1]])
+                  for index in range(len(offsets) - 1)]
+        mapper.extend([] for _ in range(len(words) - len(mapper)))
+        for key in word_tag_counts:
+            word_id, tag_id = unpack(key)
+            if tag_id not in mapper[word_id]:
+                mapper[word_id].append(tag_id)
+
+        mapper_offsets, mapper_tags = array('q', [0]), array('q')
+        for tag_ids in mapper:
+            mapper_tags.extend(tag_ids)
+            mapper_offsets.append(len(mapper_tags))
+
+        tag_counts = array('q', tag_counts)
+        for tag_id, count in enumerate(self.tag_counts):
+            tag_counts[tag_id] += count
+
+        self.word_tag_counts.update(word_tag_counts)
+        self.tag_bigram_counts.update(tag_bigram_counts)
+        self.words, self.tags, self.tag_counts = words, tags, tag_counts
+        self.mapper_offsets, self.mapper_tags = mapper_offsets, mapper_tags
+        self._set_views()
+
+
     def fit(self, sentence_tokens):
         """Fit parts of speech tagger model on the sentences.
 
@@ -79,66 +275,169 @@ class POSTagger:
             sentence_tokens (list of lists):
                 List of tokens in each sentence in corpus.
         """
-        self.vocabulary_tag_mapper = self._map_words_to_tags(sentence_tokens)
+        return self.fit_weighted((sent, 1) for sent in sentence_tokens)
+
+
+    def fit_weighted(self, weighted_sentences):
+        """Fit parts of speech tagger model on weighted sentences, i.e.
+        a sentence with weight w is counted as w copies of itself.
 
-        for sent in sentence_tokens:
+        Each token is parsed once, split at its last '_', so words may
+        contain '_'. Words and tags are interned to integer ids, and
+        word-tag, tag and tag bigram counts are filled together, keyed
+        by ids, in a single pass, then merged into the arrays of the
+        tagger once, at the end.
+
+        Arguments:
+            weighted_sentences (iterable):
+                Pairs of a list of tokens in a sentence, and its weight.
+
+        Raises:
+            ValueError:
+                If a token has no '_' separating the word from its tag.
+        """
+        words, tags = Vocabulary(self.words), Vocabulary(self.tags)
+        word_ids, tag_ids = words.word_to_id, tags.word_to_id
+        word_tag_counts, tag_bigram_counts = {}, {}
+        tag_counts = array('q', [0]) * len(tags)
+
+        for sent, weight in weighted_sentences:
+            prev_id = None
             for each in sent:
-                word, tag = each.split('_')
-                if (word, tag) in self.word_tags:
-                    count = self.word_tags[(word, tag)]
-                    self.word_tags[(word, tag)] = count + 1
-                else:
-                    self.word_tags[(word, tag)] = 1
-
-        tag_tokens = []
-        for sent in sentence_tokens:
-            tag_tokens.append([each.split('_')[1] for each in sent])
-
-        for each in tag_tokens:
-            unigram_counts = dict(Counter(each))
-
-            for ug in unigram_counts:
-                if ug in self.tag_unigrams:
-                    self.tag_unigrams[ug] += unigram_counts[ug]
-                else:
-                    self.tag_unigrams[ug] = unigram_counts[ug]
-
-            bigrams = [(each[i - 1], each[i]) for i in range(1, len(each))]
-            bigram_counts = dict(Counter(bigrams))
-
-            for bg in bigram_counts:
-                if bg in self.tag_bigrams:
-                    self.tag_bigrams[bg] += bigram_counts[bg]
-                else:
-                    self.tag_bigrams[bg] = bigram_counts[bg]
+                word, separator, tag = each.rpartition('_')
+                if not separator:
+                    raise ValueError(f'Token {each!r} is not of the form WORD_TAG.')
+                word_id = word_ids.get(word)
+                if word_id is None:
+                    word_id = words.add(word)
+                tag_id = tag_ids.get(tag)
+                if tag_id is None:
+                    tag_id = tags.add(tag)
+                    tag_counts.append(0)
+
+                key = (word_id << SHIFT) | tag_id
+                word_tag_counts[key] = word_tag_counts.get(key, 0) + weight
+                tag_counts[tag_id] += weight
+                if prev_id is not None:
+                    key = (prev_id << SHIFT) | tag_id
+                    tag_bigram_counts[key] = tag_bigram_counts.get(key, 0) + weight
+                prev_id = tag_id
+
+        self._version = None
+        self._add_counts(words, tags, word_tag_counts, tag_counts, tag_bigram_counts)
         return self
 
 
-    def transform(self, sentence_tokens, debug):
-        """Parts of speech tags are computer for a sentence, represented
-        as a list of tokens.
+    def merge(self, other):
+        """Adds the counts of another parts of speech tagger to this
+        tagger.
 
-        If ``debug`` argument is passed, steps to compute the parts of
-        speech tags are presented.
+        Arguments:
+            other (pos.POSTagger):
+                Fitted parts of speech tagger.
+        """
+        words, tags = Vocabulary(self.words), Vocabulary(self.tags)
+        tag_ids = tags.encode(other.tags)
+        word_ids = words.encode(other.words)
+
+        tag_counts = array('q', [0]) * len(tags)
+        for tag_id, count in zip(tag_ids, other.tag_counts):
+            tag_counts[tag_id] += count
+
+        word_tag_counts = {}
+        offsets = other.mapper_offsets
+        for index, word_id in enumerate(word_ids):
+            for tag_id in other.mapper_tags[offsets[index]:offsets[index + 1]]:
+                word_tag_counts[pack(word_id, tag_ids[tag_id])] = \
+                    other.word_tag_counts.get(index, tag_id)
+        tag_bigram_counts = {pack(tag_ids[first_id], tag_ids[second_id]): count
+                             for first_id, second_id, count in other.tag_bigram_counts.items()}
+
+        self._version = None
+        self._add_counts(words, tags, word_tag_counts, tag_counts, tag_bigram_counts)
+        return self
+
+
+    def save(self, path):
+        """Saves the fitted tagger in a compact binary format, see
+        :mod: ``persistence``.
+
+        Arguments:
+            path (str):
+                Path to model file.
+        """
+        word_offsets, word_data, word_order = encode_strings(self.words)
+        tag_offsets, tag_data, tag_order = encode_strings(self.tags)
+        write_sections(path, 'pos', {
+            'meta': write_meta({}),
+            'word_offsets': word_offsets,
+            'word_data': word_data,
+            'word_order': word_order,
+            'tag_offsets': tag_offsets,
+            'tag_data': tag_data,
+            'tag_order': tag_order,
+            'word_tag_keys': array('q', self.word_tag_counts.keys),
+            'word_tag_counts': array('q', self.word_tag_counts.counts),
+            'tag_unigrams': array('q', self.tag_counts),
+            'tag_bigram_keys': array('q', self.tag_bigram_counts.keys),
+            'tag_bigram_count': array('q', self.tag_bigram_counts.counts),
+            'mapper_offsets': array('q', self.mapper_offsets),
+            'mapper_tags': array('q', self.mapper_tags),
+        })
+
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        """Loads a tagger saved with :func: ``save``.
+
+        Arguments:
+            path (str):
+                Path to model file.
+            use_mmap (bool):
+                If True, counts are read-only views over the memory-mapped
+                file, paged in lazily. Otherwise, they are copied into
+                memory, and words and tags are interned to dictionaries.
+
+        Returns:
+            tagger (pos.POSTagger):
+                Fitted parts of speech tagger.
+        """
+        sections = read_sections(path, 'pos', use_mmap)
+        read_meta(sections['meta'])
+
+        tagger = cls()
+        tagger.words = StringTable(sections['word_offsets'], sections['word_data'],
+                                   sections['word_order'])
+        tagger.tags = StringTable(sections['tag_offsets'], sections['tag_data'],
+                                  sections['tag_order'])
+        if not use_mmap:
+            tagger.words, tagger.tags = Vocabulary(tagger.words), Vocabulary(tagger.tags)
+        tagger.word_tag_counts = BigramCounts(sections['word_tag_keys'],
+                                              sections['word_tag_counts'])
+        tagger.tag_counts = sections['tag_unigrams']
+        tagger.tag_bigram_counts = BigramCounts(sections['tag_bigram_keys'],
+                                                sections['tag_bigram_count'])
+        tagger.mapper_offsets = sections['mapper_offsets']
+        tagger.mapper_tags = sections['mapper_tags']
+        tagger._set_views()
+        return tagger
+
+
+    def _exhaustive(self, sentence_tokens):
+        """Scores every combination of POS tags for a sentence, and
+        returns the most probable one. Takes time exponential in the
+        length of the sentence; kept to verify :func: ``_viterbi``.
 
         Arguments:
             sentence_tokens (list):
-                List of tokens in a sentence.
-            debug (bool):
-                Debugging flag
+                List of in-vocabulary tokens in a sentence.
 
         Returns:
-            argmax_tags (list):
+            argmax_tags (tuple):
                 Sequence of tags for the sentence.
             argmax_prob (float):
                 Probability of sequence of tags.
         """
-        for word in sentence_tokens:
-            if word not in self.vocabulary_tag_mapper:
-                print('Input sentence contains out-of-vocabulary words.')
-                print('Probability of tags = 0')
-                return
-
         tag_combs = list(self._get_tag_combinations(sentence_tokens))
         probs = {}
 
@@ -155,6 +454,137 @@ class POSTagger:
         argmax_prob = max(probs.values())
         max_prob_tags_index = int(max(probs, key = lambda x: probs[x]))
         argmax_tags = tag_combs[max_prob_tags_index]
+        return argmax_tags, argmax_prob
+
+
+    def _viterbi(self, sentence_tokens):
+        """Computes the most probable combination of POS tags for a
+        sentence by dynamic programming over the tags of each word, in
+        O(n * T^2) time and O(n * T) memory, where T is the largest
+        number of tags of a word.
+
+        Probabilities are multiplied in the same order as in
+        :func: ``_exhaustive``, so both return the same probability.
+        When several sequences of tags tie for it, each tag keeps the
+        earliest previous tag with the best probability, and the
+        earliest last tag is chosen, whereas :func: ``_exhaustive``
+        returns the first sequence in the order of
+        :func: ``_get_tag_combinations``. The tags returned may then
+        differ.
+
+        Tags are decoded by id, with the probabilities of each word from
+        :func: ``_tag_row`` and of each transition from ``transitions``,
+        rather than through the views keyed by strings.
+
+        Arguments:
+            sentence_tokens (list):
+                List of in-vocabulary tokens in a sentence.
+
+        Returns:
+            argmax_tags (tuple):
+                Sequence of tags for the sentence.
+            argmax_prob (float):
+                Probability of sequence of tags.
+        """
+        transitions = self.transitions
+        rows = [self._tag_row(word) for word in sentence_tokens]
+        prev_tags, prev_probs = [self.tags.lookup('<s>')], [1]
+        backpointer = []
+
+        for tags, _, emissions in rows:
+            probs_t, backpointer_t = [], []
+            for tag, emission in zip(tags, emissions):
+                best_prob, best_index = None, 0
+                for index, (prev_tag, prev_prob) in enumerate(zip(prev_tags, prev_probs)):
+                    prob = prev_prob * (emission * transitions[prev_tag][tag])
+                    if best_prob is None or prob > best_prob:
+                        best_prob, best_index = prob, index
+                probs_t.append(best_prob)
+                backpointer_t.append(best_index)
+            prev_tags, prev_probs = tags, probs_t
+            backpointer.append(backpointer_t)
+
+        end = self.tags.lookup('</s>')
+        best_prob, best_index = None, 0
+        for index, (prev_tag, prev_prob) in enumerate(zip(prev_tags, prev_probs)):
+            prob = prev_prob * transitions[prev_tag][end]
+            if best_prob is None or prob > best_prob:
+                best_prob, best_index = prob, index
+
+        if best_prob == 0:
+            # Every combination is equally improbable, and the first one
+            # is returned, as in :func: ``_exhaustive``.
+            return tuple(names[0] for _, names, _ in rows), best_prob
+
+        argmax_tags = []
+        for (_, names, _), backpointer_t in zip(reversed(rows), reversed(backpointer)):
+            argmax_tags.append(names[best_index])
+            best_index = backpointer_t[best_index]
+        return tuple(reversed(argmax_tags)), best_prob
+
+
+    def decode(self, sentence_tokens, exhaustive=False):
+        """Computes the most probable sequence of POS tags for a
+        sentence, without printing it, through ``cache`` if it is set.
+
+        Arguments:
+            sentence_tokens (list):
+                List of tokens in a sentence.
+            exhaustive (bool):
+                If True, every combination of tags is scored, see
+                :func: ``_exhaustive``. Otherwise, tags are decoded by
+                dynamic programming, see :func: ``_viterbi``.
+
+        Returns:
+            argmax_tags (tuple or None):
+                Sequence of tags for the sentence, or None if it
+                contains out-of-vocabulary words.
+            argmax_prob (float):
+                Probability of sequence of tags.
+        """
+        for word in sentence_tokens:
+            if word not in self._tag_rows and self.words.lookup(word) is None:
+                return None, 0
+
+        decode = self._exhaustive if exhaustive else self._viterbi
+        if self.cache is None:
+            argmax_tags, argmax_prob = decode(sentence_tokens)
+        else:
+            mode = 'exhaustive' if exhaustive else 'viterbi'
+            argmax_tags, argmax_prob = self.cache.decode(self, sentence_tokens, decode, mode)
+        return tuple(argmax_tags), argmax_prob
+
+
+    def transform(self, sentence_tokens, debug, exhaustive=False):
+        """Parts of speech tags are computer for a sentence, represented
+        as a list of tokens.
+
+        If ``debug`` argument is passed, steps to compute the parts of
+        speech tags are presented.
+
+        Arguments:
+            sentence_tokens (list):
+                List of tokens in a sentence.
+            debug (bool):
+                Debugging flag
+            exhaustive (bool):
+                If True, every combination of tags is scored, see
+                :func: ``_exhaustive``. Otherwise, tags are decoded by
+                dynamic programming, see :func: ``_viterbi``.
+
+        Returns:
+            argmax_tags (list):
+                Sequence of tags for the sentence.
+            argmax_prob (float):
+                Probability of sequence of tags.
+        """
+        for word in sentence_tokens:
+            if word not in self.vocabulary_tag_mapper:
+                print('Input sentence contains out-of-vocabulary words.')
+                print('Probability of tags = 0')
+                return
+
+        argmax_tags, argmax_prob = self.decode(sentence_tokens, exhaustive)
 
         print('')
         print(f"Sentence is: {' '.join(sentence_tokens)}")
@@ -0,0 +1,43 @@
+"""
+Access to modules implemented in Homework-2, and shared with it.
+
+The binary model format (``persistence``), the sharding and
+deduplication of corpora (``corpus``) and the array-backed counts
+(``storage``) are implemented once, in Homework-2, so that both
+homeworks read and write the same files, and a fix is made in one
+place.
+
+Modules of Homework-3 import these names from this module, e.g.
+``from shared import read_shard``, rather than from the modules of
+Homework-2, so that the dependency on Homework-2 is visible where it is
+used, and is listed in one place. The directory of Homework-2 is
+appended to the module search path, after the directory of Homework-3,
+so that modules of Homework-3 take precedence over those of the same
+name in Homework-2.
+"""
+
+
+import os
+import sys
+
+
+HOMEWORK_2 = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                           os.pardir, 'Homework-2'))
+
+
+if not os.path.isdir(HOMEWORK_2):
+    raise ImportError(f'Homework-3 uses modules of Homework-2, expected in {HOMEWORK_2}.')
+
+if HOMEWORK_2 not in sys.path:
+    sys.path.append(HOMEWORK_2)
+
+
+from corpus import count_unique_lines, shard_ranges, read_shard
+from storage import Vocabulary, BigramCounts, SHIFT, pack, unpack
+from persistence import write_sections, read_sections, write_meta, read_meta, \
+                        encode_strings, StringTable
+
+
+__all__ = ['count_unique_lines', 'shard_ranges', 'read_shard', 'Vocabulary', 'BigramCounts',
+           'SHIFT', 'pack', 'unpack', 'write_sections', 'read_sections', 'write_meta',
+           'read_meta', 'encode_strings', 'StringTable']
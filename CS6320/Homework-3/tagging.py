@@ -0,0 +1,122 @@
+"""
+Batch tagging of files of sentences with a pool of worker processes.
+
+Sentences are read lazily, in chunks of lines, from a file or standard
+input, and each chunk is tagged in a worker process. The model is sent
+to, or loaded by, each worker once, when the pool starts, rather than
+with every chunk. Chunks are written back in input order as soon as
+they are tagged, with one sentence of WORD_TAG tokens per line.
+"""
+
+
+import sys
+import time
+from itertools import islice
+from multiprocessing import Pool
+
+
+_model = None
+
+
+def _initialize_worker(model, load_fn):
+    global _model
+    _model = model if load_fn is None else load_fn(model)
+
+
+def _tag_chunk(lines):
+    """Tags a chunk of lines with the model of the worker.
+
+    Returns:
+        (tuple):
+            Tagged lines, and number of tokens.
+    """
+    sentences = [line.split() for line in lines]
+    if hasattr(_model, 'decode_batch'):
+        sequences, _ = _model.decode_batch(sentences)
+    else:
+        sequences = [_model.decode(tokens)[0] if tokens else [] for tokens in sentences]
+
+    tagged = []
+    for tokens, tags in zip(sentences, sequences):
+        tags = tags if tags is not None else [None] * len(tokens)
+        tagged.append(' '.join(f'{word}_{tag}' for word, tag in zip(tokens, tags)))
+    return tagged, sum(len(tokens) for tokens in sentences)
+
+
+def read_chunks(input_file, chunk_size):
+    """Reads lines from a file in chunks.
+
+    Yields:
+        (list):
+            List of at most 'chunk_size' lines.
+    """
+    while True:
+        chunk = list(islice(input_file, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def tag_file(model, input_path, output_path, num_workers=1, chunk_size=1000, load_fn=None):
+    """Tags every sentence of a file, one sentence of whitespace
+    separated tokens per line. Tokens of sentences which cannot be
+    tagged, e.g. as they contain out-of-vocabulary words, are written
+    with tag None.
+
+    Arguments:
+        model (object or str):
+            Model with a ``decode`` method, as :class: ``pos.POSTagger``
+            or :class: ``hmm.Viterbi``, or path to a model, if
+            'load_fn' is passed.
+        input_path (str):
+            Path to input file, or '-' for standard input.
+        output_path (str):
+            Path to output file, or '-' for standard output.
+        num_workers (int):
+            Number of worker processes. If 1, chunks are tagged in this
+            process.
+        chunk_size (int):
+            Number of lines sent to a worker at a time.
+        load_fn (callable or None):
+            If passed, each worker loads the model with ``load_fn(model)``,
+            e.g. :func: ``pos.POSTagger.load``, so that a memory-mapped
+            model is shared by workers rather than copied.
+
+    Returns:
+        (dict):
+            Numbers of sentences and tokens tagged, and elapsed seconds.
+    """
+    input_file = sys.stdin if input_path == '-' else open(input_path, 'r')
+    output_file = sys.stdout if output_path == '-' else open(output_path, 'w')
+    num_sentences, num_tokens = 0, 0
+    start = time.perf_counter()
+
+    try:
+        chunks = read_chunks(input_file, chunk_size)
+        if num_workers > 1:
+            pool = Pool(num_workers, initializer=_initialize_worker, initargs=(model, load_fn))
+            results = pool.imap(_tag_chunk, chunks)
+        else:
+            pool = None
+            _initialize_worker(model, load_fn)
+            results = map(_tag_chunk, chunks)
+
+        for tagged, tokens in results:
+            for line in tagged:
+                output_file.write(line + '\n')
+            num_sentences += len(tagged)
+            num_tokens += tokens
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+        else:
+            output_file.flush()
+
+    return {'sentences': num_sentences, 'tokens': num_tokens,
+            'seconds': time.perf_counter() - start}
@@ -0,0 +1,250 @@
+"""
+Unsupervised re-estimation of Hidden Markov Models with the
+Baum-Welch (EM) algorithm.
+
+Expected counts are computed by the forward-backward algorithm, with
+the forward and backward probabilities of each step rescaled to sum to
+1, so that long sentences do not underflow. The log likelihood of a
+sentence is the sum of the logarithms of the scaling factors.
+
+In the E-step, the corpus is split into contiguous shards, and the
+expected counts of each shard are computed in a worker process. The
+corpus is sent to the workers once, when the pool starts, and only the
+current matrices are sent at each iteration. The expected counts are
+summed in shard order, so results do not depend on scheduling.
+"""
+
+
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from hmm import NumpyViterbi, forward_backward
+
+
+def expected_counts(start, transitions, emissions, sentences):
+    """E-step of the Baum-Welch algorithm over a list of sentences.
+    Sentences with probability 0 under the current matrices are
+    skipped.
+
+    Arguments:
+        start, transitions, emissions (numpy.ndarray):
+            Current matrices, see :func: ``hmm.forward_backward``.
+        sentences (list):
+            List of arrays of word indices.
+
+    Returns:
+        (tuple):
+            Expected counts of each tag at the start (T), of transitions
+            (T x T), of emissions (V x T), the total log likelihood of
+            the sentences, and the number of sentences skipped.
+    """
+    start_counts = np.zeros_like(start)
+    transition_counts = np.zeros_like(transitions)
+    emission_counts = np.zeros_like(emissions)
+    log_likelihood, skipped = 0.0, 0
+
+    for indices in sentences:
+        alpha, beta, scales = forward_backward(start, transitions, emissions, indices)
+        if scales[-1] == 0:
+            skipped += 1
+            continue
+
+        gamma = alpha * beta
+        start_counts += gamma[0]
+        np.add.at(emission_counts, indices, gamma)
+        if len(indices) > 1:
+            # Sum over steps of alpha_t-1(j) * P(i | j) * P(word_t | i) * beta_t(i) / c_t
+            weighted = emissions[indices[1:]] * beta[1:] / scales[1:, None]
+            transition_counts += (alpha[:-1].T @ weighted) * transitions
+        log_likelihood += np.log(scales).sum()
+    return start_counts, transition_counts, emission_counts, log_likelihood, skipped
+
+
+_corpus = None
+
+
+def _initialize_worker(corpus):
+    global _corpus
+    _corpus = corpus
+
+
+def _expected_counts_shard(args):
+    start, end, matrices = args
+    return expected_counts(*matrices, _corpus[start:end])
+
+
+class BaumWelch:
+    """Re-estimates the matrices of a Hidden Markov Model on unlabeled
+    sentences, with the Baum-Welch algorithm.
+
+    Parameters:
+        vocabulary (list):
+            List of words in corpus.
+        pos_tags (list):
+            List of POS tags in corpus.
+        delta (numpy.ndarray):
+            State Transition matrix, (T + 1) x T, with start
+            probabilities in row 0, as in :class: ``hmm.Viterbi``.
+        obs (numpy.ndarray):
+            Observation Likelihood matrix, T x V.
+        num_workers (int):
+            Number of worker processes for the E-step.
+        max_iter (int):
+            Maximum number of iterations.
+        tol (float):
+            Training stops once the log likelihood improves by less
+            than ``tol``, relative to its magnitude.
+        checkpoint (str or None):
+            Path to which the matrices are saved after each iteration.
+        log_likelihoods (list):
+            Log likelihood of the corpus before each iteration.
+        num_skipped (int):
+            Number of sentences skipped in the last iteration, as they
+            contain out-of-vocabulary words, or have probability 0.
+    """
+    def __init__(self, vocabulary, pos_tags, delta, obs, num_workers=None,
+                 max_iter=50, tol=1e-4, checkpoint=None):
+        """Initializes :class: ``BaumWelch``.
+
+        Arguments:
+            vocabulary (list):
+                List of words in corpus.
+            pos_tags (list):
+                List of POS tags in corpus.
+            delta (list of lists or numpy.ndarray):
+                Initial State Transition matrix.
+            obs (list of lists or numpy.ndarray):
+                Initial Observation Likelihood matrix.
+            num_workers (int or None):
+                Number of worker processes. If None, number of CPUs is
+                used.
+            max_iter (int):
+                Maximum number of iterations.
+            tol (float):
+                Relative tolerance on the improvement of log likelihood.
+            checkpoint (str or None):
+                Path to which the matrices are saved after each
+                iteration, with ``numpy.savez``.
+        """
+        self.vocabulary = vocabulary
+        self.pos_tags = pos_tags
+        self.delta = np.array(delta, dtype=np.float64)
+        self.obs = np.array(obs, dtype=np.float64)
+        self.num_workers = num_workers or os.cpu_count()
+        self.max_iter = max_iter
+        self.tol = tol
+        self.checkpoint = checkpoint
+        self.log_likelihoods = []
+        self.num_skipped = 0
+
+
+    @classmethod
+    def from_checkpoint(cls, path, vocabulary, pos_tags, **kwargs):
+        """Resumes training from matrices saved at a checkpoint.
+
+        Arguments:
+            path (str):
+                Path to checkpoint.
+            vocabulary (list):
+                List of words in corpus.
+            pos_tags (list):
+                List of POS tags in corpus.
+            kwargs (dict):
+                Further arguments of :class: ``BaumWelch``.
+
+        Returns:
+            (training.BaumWelch):
+                Trainer with the saved matrices and log likelihoods.
+        """
+        with np.load(path) as checkpoint:
+            trainer = cls(vocabulary, pos_tags, checkpoint['delta'], checkpoint['obs'], **kwargs)
+            trainer.log_likelihoods = checkpoint['log_likelihoods'].tolist()
+        return trainer
+
+
+    def _save_checkpoint(self):
+        with open(self.checkpoint, 'wb') as output_file:
+            np.savez(output_file, delta=self.delta, obs=self.obs,
+                     log_likelihoods=np.array(self.log_likelihoods))
+
+
+    def _maximize(self, start_counts, transition_counts, emission_counts):
+        """M-step: normalizes expected counts into probabilities. Rows
+        of tags which are never expected to occur are kept as is.
+        """
+        counts = np.vstack([start_counts, transition_counts])
+        totals = counts.sum(axis=1, keepdims=True)
+        np.divide(counts, totals, out=self.delta, where=totals > 0)
+
+        totals = emission_counts.sum(axis=0)[:, None]
+        np.divide(emission_counts.T, totals, out=self.obs, where=totals > 0)
+
+
+    def _converged(self):
+        if len(self.log_likelihoods) < 2:
+            return False
+        previous, current = self.log_likelihoods[-2:]
+        return current - previous <= self.tol * abs(previous)
+
+
+    def fit(self, sentences):
+        """Re-estimates the matrices on unlabeled sentences.
+
+        Arguments:
+            sentences (list):
+                List of lists of tokens. Sentences with words outside
+                the vocabulary are skipped.
+
+        Returns:
+            (training.BaumWelch):
+                Trainer with re-estimated matrices.
+        """
+        word_index = {word: index for index, word in enumerate(self.vocabulary)}
+        corpus = []
+        for tokens in sentences:
+            indices = [word_index.get(token) for token in tokens]
+            if indices and None not in indices:
+                corpus.append(np.array(indices, dtype=np.int64))
+        self.num_skipped = num_oov = len(sentences) - len(corpus)
+        if not corpus:
+            return self
+
+        step = max(1, -(-len(corpus) // self.num_workers))
+        shards = [(start, start + step) for start in range(0, len(corpus), step)]
+
+        with Pool(self.num_workers, initializer=_initialize_worker, initargs=(corpus,)) as pool:
+            for _ in range(self.max_iter):
+                matrices = (self.delta[0], self.delta[1:], np.ascontiguousarray(self.obs.T))
+                results = pool.map(_expected_counts_shard,
+                                   [(start, end, matrices) for start, end in shards])
+
+                start_counts, transition_counts, emission_counts, log_likelihood, skipped = results[0]
+                for result in results[1:]:
+                    start_counts += result[0]
+                    transition_counts += result[1]
+                    emission_counts += result[2]
+                    log_likelihood += result[3]
+                    skipped += result[4]
+
+                self.log_likelihoods.append(float(log_likelihood))
+                self.num_skipped = num_oov + skipped
+                if self._converged():
+                    break
+
+                self._maximize(start_counts, transition_counts, emission_counts)
+                if self.checkpoint:
+                    self._save_checkpoint()
+        return self
+
+
+    def viterbi(self, decoder=NumpyViterbi, **kwargs):
+        """Returns a decoder over the re-estimated matrices.
+
+        Arguments:
+            decoder (type):
+                :class: ``hmm.Viterbi``, :class: ``hmm.NumpyViterbi`` or
+                :class: ``hmm.SparseViterbi``.
+        """
+        return decoder(self.vocabulary, self.pos_tags, self.delta, self.obs, **kwargs)
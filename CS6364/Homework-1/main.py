@@ -5,6 +5,7 @@ To get the options, run:
     $ python main.py --help 
 """
 
+import sys
 import argparse
 from search import *
 
@@ -16,7 +17,7 @@ if __name__ == '__main__':
                         (a) \'*\' refers to the blank tile in 8-Puzzle Problem. \
                         (b) First line -> Input State, Second line -> Goal State.')
     parser.add_argument('--algorithm', dest='algo', type=str,
-                        choices=['bfs', 'dfs', 'ids', 'astar1', 'astar2'],
+                        choices=['bfs', 'dfs', 'ids', 'astar1', 'astar2', 'multi'],
                         required=True, help='Search algorithm to run, choices are: \
                         (a) bfs: Breadth-First Search\
                         (b) dfs: Depth-First Search \
@@ -24,21 +25,56 @@ if __name__ == '__main__':
                         (d) astar1: A* algorithm with heuristic 1 \
                             (Number of misplaced tiles) \
                         (e) astar2: A* algorithm with heuristic 2 \
-                            (Manhattan Distance)')
+                            (Manhattan Distance) \
+                        (f) multi: Breadth-First sweep from the state in the first \
+                            line to the states in all remaining lines')
     parser.add_argument('--depth-limit', dest='depth_limit', type=int,
                         default=10, help='Depth limit for search traversal. \
                         Valid for Depth-First and Iterative-Deepening Search algorithms.')
 
+    parser.add_argument('--backward', dest='backward', action='store_true',
+                        help='Valid for \'multi\' algorithm. If passed, the state in \
+                        the first line is the shared goal state, and paths are \
+                        computed from each of the remaining states to it.')
+    parser.add_argument('--verbose', dest='verbose', action='store_true',
+                        help='If passed, the lower bound on the number of moves \
+                        is printed before the search is run.')
+
     args = parser.parse_args()
 
+    if args.algo == 'multi':
+        source_state, target_states = read_multi_states(args.input_path)
+        MultiTargetBFS(source_state, target_states,
+                       backward=args.backward).print_results()
+        sys.exit(0)
+
     start_state, goal_state = read_states(args.input_path)
 
+    analyzer = InstanceAnalyzer(start_state, goal_state)
+    if not analyzer.solvable:
+        print('FAILURE: Goal state not reachable (inversion parity mismatch).')
+        sys.exit(0)
+
+    if args.verbose:
+        print(f'Lower bound on number of moves = {analyzer.lower_bound}\n')
+
+    if args.algo != 'bfs':
+        depth_limit = args.depth_limit
+        if args.algo == 'ids':
+            depth_limit -= 1
+        if not analyzer.within_depth_limit(depth_limit):
+            print('FAILURE: Goal state not reachable within depth limit '
+                  f'of {args.depth_limit} (lower bound on number of moves '
+                  f'= {analyzer.lower_bound}).')
+            sys.exit(0)
+
     if args.algo == 'bfs':
         BFS(start_state, goal_state)
     if args.algo == 'dfs':
         DFS(start_state, goal_state, args.depth_limit)
     elif args.algo == 'ids':
-        IDS(start_state, goal_state, args.depth_limit)
+        IDS(start_state, goal_state, args.depth_limit,
+            start_depth=max(1, analyzer.lower_bound - 1))
     elif args.algo == 'astar1':
         AStar(start_state, goal_state, args.depth_limit,
               heuristic='misplaced')
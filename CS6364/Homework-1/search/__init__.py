@@ -5,6 +5,13 @@ Implementations for uninformed and informed search strategies:
 (c) Iterative-Deepening Search : ``search.iterative_deepening.IDS``
 (d) A-Star Search: ``search.aster.AStar``
 
+Instances can be analyzed with ``search.analysis.InstanceAnalyzer``
+before running any of the above, to reject unsolvable instances and
+compute a lower bound on the number of moves.
+
+One-to-many and many-to-one queries are answered with a single sweep
+by ``search.multi_target.MultiTargetBFS``.
+
 Each requires multiple membership-tests in the search algorithm.
 Membership-test in a list has a time complexity of O(n), while that
 in a set is O(1). Thus, sets are used for this purpose.
@@ -15,3 +22,5 @@ from search.depth_first import DFS
 from search.iterative_deepening import IDS
 from search.breadth_first import BFS
 from search.astar import AStar
+from search.analysis import InstanceAnalyzer, is_solvable, lower_bound
+from search.multi_target import MultiTargetBFS
@@ -0,0 +1,151 @@
+"""Instance pre-analysis for the Eight-Puzzle problem, run before any
+search strategy in the ``search`` module.
+
+Only half of all tile permutations are reachable from a given state.
+When the goal lies in the other half, every search strategy exhausts
+the reachable state space before reporting FAILURE. The parity test
+below rejects such instances in O(n^2) time for n tiles instead.
+"""
+
+from search.utils import manhattan
+
+
+def _flatten(state):
+    return [item for sublist in state.config for item in sublist]
+
+
+def count_inversions(state):
+    """Counts pairs of numbered tiles which appear in reverse order,
+    when the state is read row by row. The blank tile is ignored.
+
+    Arguments:
+        state (search.utils.State):
+            Eight-Puzzle state.
+
+    Returns:
+        inversions (int):
+            Number of inversions in 'state'.
+    """
+    tiles = [int(x) for x in _flatten(state) if x != '*']
+    inversions = 0
+    for i in range(len(tiles)):
+        for j in range(i + 1, len(tiles)):
+            if tiles[i] > tiles[j]:
+                inversions += 1
+    return inversions
+
+
+def _blank_row(state):
+    for x, row in enumerate(state.config):
+        if '*' in row:
+            return x
+
+
+def is_solvable(start, goal):
+    """Checks whether 'goal' state is reachable from 'start' state.
+
+    Every move preserves the parity of the number of inversions when
+    the board width is odd. For an even board width, moving the blank
+    tile up or down also changes the blank row, so the parity of
+    inversions plus the blank row is preserved instead.
+
+    Arguments:
+        start (search.utils.State):
+            Start state.
+        goal (search.utils.State):
+            Goal state.
+
+    Returns:
+        (bool):
+            True, if goal state is reachable from start state, else, False.
+    """
+    width = len(start.config[0])
+    start_parity = count_inversions(start)
+    goal_parity = count_inversions(goal)
+
+    if width % 2 == 0:
+        start_parity += _blank_row(start)
+        goal_parity += _blank_row(goal)
+    return start_parity % 2 == goal_parity % 2
+
+
+def misplaced_tiles(current, goal):
+    """Computes number of misplaced numbered tiles in current state
+    relative to goal state.
+
+    Unlike :func: ``search.utils.number_of_misplaced``, the blank tile
+    is not counted, which keeps the estimate admissible.
+
+    Arguments:
+        current (search.utils.State):
+            Current state.
+        goal (search.utils.State):
+            Goal state.
+
+    Returns:
+        (int):
+            Number of misplaced numbered tiles.
+    """
+    return len([x for x, y in zip(_flatten(current), _flatten(goal))
+                if x != y and x != '*'])
+
+
+def lower_bound(start, goal):
+    """Computes a lower bound on the number of moves from start state
+    to goal state, as the maximum of the admissible heuristics.
+
+    Arguments:
+        start (search.utils.State):
+            Start state.
+        goal (search.utils.State):
+            Goal state.
+
+    Returns:
+        (int):
+            Lower bound on the number of moves.
+    """
+    return max(misplaced_tiles(start, goal), manhattan(start, goal))
+
+
+class InstanceAnalyzer:
+    """Analyzes an Eight-Puzzle instance before it is handed to a
+    search strategy.
+
+    Parameters:
+        solvable (bool):
+            True, if goal state is reachable from start state.
+        lower_bound (int or None):
+            Lower bound on the number of moves from start to goal.
+            None, if the instance is not solvable.
+    """
+    def __init__(self, start, goal):
+        """Initializes :class: ``InstanceAnalyzer``.
+
+        Arguments:
+            start (search.utils.State):
+                Start state.
+            goal (search.utils.State):
+                Goal state.
+        """
+        self.solvable = is_solvable(start, goal)
+        if self.solvable:
+            self.lower_bound = lower_bound(start, goal)
+        else:
+            self.lower_bound = None
+
+    def within_depth_limit(self, depth_limit):
+        """Checks whether a depth-limited search could reach the goal
+        state at all. Nodes are expanded while their depth does not
+        exceed ``depth_limit``, so the deepest node generated lies at
+        ``depth_limit + 1``.
+
+        Arguments:
+            depth_limit (int):
+                Depth limit of the search strategy.
+
+        Returns:
+            (bool):
+                False, if the lower bound exceeds the deepest node
+                reachable within ``depth_limit``, else, True.
+        """
+        return self.solvable and self.lower_bound <= depth_limit + 1
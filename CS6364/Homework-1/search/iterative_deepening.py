@@ -15,7 +15,7 @@ class IDS(UninformedSearch):
         path (list):
             Sequence of nodes from start to goal.
     """
-    def __init__(self, start, goal, depth_limit):
+    def __init__(self, start, goal, depth_limit, start_depth=1):
         """Initializes :class: ``IDS``.
 
         Arguments:
@@ -25,10 +25,17 @@ class IDS(UninformedSearch):
                 Goal node.
             depth_limit (int):
                 Expand the search only until ``depth_limit``.
+            start_depth (int):
+                Maximum depth of the first iteration. Iterations at
+                shallower depths are skipped, which is safe when
+                ``start_depth`` is seeded from a lower bound on the
+                number of moves (see :class: ``search.analysis.InstanceAnalyzer``).
         """
         start = Node(start, 'root', 0)
+        self.success = None
+        self.visited = [start]
 
-        for depth in range(1, depth_limit):
+        for depth in range(start_depth, depth_limit):
             self.success = None
             self.visited = [start]
             self.frontier = [start]
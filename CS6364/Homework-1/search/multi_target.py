@@ -0,0 +1,143 @@
+"""Implementation of one-to-many and many-to-one queries with a single
+Breadth-First sweep.
+
+Every move in the Eight-Puzzle problem can be undone, so the distance
+from a state to the shared endpoint equals the distance from the shared
+endpoint to that state. A single sweep from the shared endpoint thus
+labels all requested targets, in either direction, and stops as soon as
+every reachable target is settled.
+"""
+
+from collections import deque
+
+from search.utils import State
+from search.analysis import is_solvable
+
+
+def _key(state):
+    return tuple(item for sublist in state.config for item in sublist)
+
+
+def _neighbours(key, width=3):
+    """Computes all neighbour configurations of a flattened configuration,
+    with the blank tile moved in the order 'up', 'down', 'left', 'right'.
+    """
+    blank = key.index('*')
+    x, y = divmod(blank, width)
+    moves = [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
+
+    neighbours = []
+    for next_x, next_y in moves:
+        if 0 <= next_x < width and 0 <= next_y < width:
+            _next = next_x * width + next_y
+            tiles = list(key)
+            tiles[blank], tiles[_next] = tiles[_next], tiles[blank]
+            neighbours.append(tuple(tiles))
+    return neighbours
+
+
+class MultiTargetBFS:
+    """Breadth-First sweep from a shared endpoint to many targets.
+
+    Parameters:
+        backward (bool):
+            If False, ``source`` is the shared start state and paths run
+            from ``source`` to each target (one-to-many).
+            If True, ``source`` is the shared goal state and paths run
+            from each target to ``source`` (many-to-one).
+        costs (list):
+            Number of moves for each target, in the order of ``targets``.
+            None, if the target is not reachable.
+        paths (list):
+            Sequence of :class: ``search.utils.State`` states for each
+            target, in the order of ``targets``. None, if the target is
+            not reachable.
+        num_nodes_expanded (int):
+            Number of expanded nodes in the sweep.
+    """
+    def __init__(self, source, targets, backward=False):
+        """Initializes :class: ``MultiTargetBFS`` and runs the sweep.
+
+        Arguments:
+            source (search.utils.State):
+                Shared endpoint of all queries.
+            targets (list):
+                List of :class: ``search.utils.State`` states.
+            backward (bool):
+                If True, paths are reported from each target to
+                ``source``, else, from ``source`` to each target.
+        """
+        self.backward = backward
+        self.num_nodes_expanded = 0
+
+        target_keys = [_key(target) for target in targets]
+        pending = set(key for key, target in zip(target_keys, targets)
+                      if is_solvable(source, target))
+
+        parents = self.run(_key(source), pending)
+
+        self.costs, self.paths = [], []
+        for key in target_keys:
+            if key in parents:
+                path = self._compute_path(key, parents)
+                self.paths.append(path)
+                self.costs.append(len(path) - 1)
+            else:
+                self.paths.append(None)
+                self.costs.append(None)
+
+    def run(self, source, pending):
+        """Runs the Breadth-First sweep from ``source`` until every key
+        in ``pending`` has been settled.
+
+        Arguments:
+            source (tuple):
+                Flattened configuration of the shared endpoint.
+            pending (set):
+                Flattened configurations of the reachable targets.
+
+        Returns:
+            parents (dict):
+                Maps each settled configuration to its predecessor.
+        """
+        parents = {source: None}
+        pending = set(pending)
+        pending.discard(source)
+        frontier = deque([source])
+
+        while frontier and pending:
+            curr = frontier.popleft()
+            self.num_nodes_expanded += 1
+            for child in _neighbours(curr):
+                if child not in parents:
+                    parents[child] = curr
+                    pending.discard(child)
+                    frontier.append(child)
+        return parents
+
+    def _compute_path(self, key, parents):
+        path = [key]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+
+        if not self.backward:
+            path = path[::-1]
+        return [State(list(config)) for config in path]
+
+    def print_results(self):
+        """Prints number of moves and path for each target.
+        """
+        for index, (cost, path) in enumerate(zip(self.costs, self.paths)):
+            print(f'Target {index}:')
+            print('==============')
+            if path is None:
+                print('FAILURE: Goal state not reachable.\n')
+                continue
+
+            for step, state in enumerate(path):
+                print(f'Step {step}:')
+                print('--------------')
+                state.show()
+            print(f'Number of moves = {cost}\n')
+
+        print(f'Number of expanded nodes = {self.num_nodes_expanded}')
@@ -8,6 +8,30 @@ from copy import deepcopy
 ACTIONS = ['up', 'down', 'left', 'right']
 
 
+TILES = ['1', '2', '3', '4', '5', '6', '7', '8', '*']
+
+
+def validate_tiles(tiles):
+    """Checks that 'tiles' is a valid Eight-Puzzle configuration, i.e.
+    each of the numbered tiles '1' to '8' and the blank tile '*'
+    appears exactly once.
+
+    Arguments:
+        tiles (list):
+            List of numbered tile positions.
+
+    Raises:
+        ValueError:
+            If 'tiles' is not a permutation of ``TILES``.
+    """
+    if len(tiles) != len(TILES):
+        raise ValueError(f'Expected {len(TILES)} tiles, found {len(tiles)}: '
+                         f'{tiles}')
+    if sorted(tiles) != sorted(TILES):
+        raise ValueError(f'Tiles must be a permutation of {TILES}, '
+                         f'found: {tiles}')
+
+
 def read_states(filename):
     """Parses input and goal states from .txt file in 'filename'.
 
@@ -22,9 +46,40 @@ def read_states(filename):
     with open(filename, 'r') as fileobj:
         contents = fileobj.readlines()
         _input, goal = contents[0].split(), contents[1].split()
+
+    validate_tiles(_input)
+    validate_tiles(goal)
     return State(_input), State(goal)
 
 
+def read_multi_states(filename):
+    """Parses a shared endpoint and multiple target states from .txt
+    file in 'filename', one state per line.
+
+    Arguments:
+        filename (str):
+            Path to input .txt file.
+
+    Returns:
+        tuple(search.utils.State, list):
+            Shared endpoint, list of target states.
+
+    Raises:
+        ValueError:
+            If 'filename' contains no states, or a state is not a valid
+            Eight-Puzzle configuration.
+    """
+    with open(filename, 'r') as fileobj:
+        contents = [line.split() for line in fileobj if line.strip()]
+
+    if not contents:
+        raise ValueError(f'No states found in {filename}')
+    for tiles in contents:
+        validate_tiles(tiles)
+    states = [State(tiles) for tiles in contents]
+    return states[0], states[1:]
+
+
 def get_child(parent, action):
     """Computes neighbour state resulting from action on 'parent'
     state.